@@ -3,18 +3,10 @@ import logging
 
 import click
 
+# The commands import stacbuilder.builder and stacbuilder.verify_openeo only
+# when they run. Those pull in GDAL, pyproj, geopandas and openeo, which takes
+# more than a second, and --help or a wrong option don't need any of them.
 
-from stacbuilder.builder import (
-    command_build_collection,
-    command_list_input_files,
-    command_list_metadata,
-    command_list_stac_items,
-    command_load_collection,
-    command_validate_collection,
-    command_post_process_collection,
-)
-
-from stacbuilder.verify_openeo import verify_in_openeo
 
 _logger = logging.getLogger(__name__)
 
@@ -36,6 +28,11 @@ def cli(verbose):
     # add the handlers to the logger
     _logger.addHandler(ch)
 
+    # The stacbuilder modules log their per-file details at debug level.
+    package_logger = logging.getLogger("stacbuilder")
+    package_logger.setLevel(log_level)
+    package_logger.addHandler(ch)
+
 
 @cli.command()
 @click.option(
@@ -53,6 +50,25 @@ def cli(verbose):
 )
 @click.option("--overwrite", is_flag=True, help="Replace the entire output directory when it already exists")
 @click.option("-m", "--max-files", type=int, default=-1, help="Stop processing after this maximum number of files.")
+@click.option(
+    "-w",
+    "--max-workers",
+    type=int,
+    default=None,
+    help="Number of workers that read the GeoTIFF metadata. Default: 4 threads per CPU (max 32) or 1 process per CPU.",
+)
+@click.option(
+    "--processes/--threads",
+    "use_processes",
+    default=False,
+    help="Read the metadata in worker processes instead of threads.",
+)
+@click.option(
+    "--scan-workers",
+    type=int,
+    default=1,
+    help="Number of threads that list the input directories at the same time, this helps on network file systems.",
+)
 @click.argument(
     "inputdir",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
@@ -61,10 +77,12 @@ def cli(verbose):
     "outputdir",
     type=click.Path(dir_okay=True, file_okay=False),
 )
-def build(glob, collection_config, overwrite, inputdir, outputdir, max_files):
+def build(glob, collection_config, overwrite, inputdir, outputdir, max_files, max_workers, use_processes, scan_workers):
     """Build a STAC collection from a directory of geotiff files."""
     click.echo("build")
 
+    from stacbuilder.builder import command_build_collection
+
     command_build_collection(
         collection_config_path=collection_config,
         glob=glob,
@@ -72,6 +90,9 @@ def build(glob, collection_config, overwrite, inputdir, outputdir, max_files):
         output_dir=outputdir,
         overwrite=overwrite,
         max_files=max_files,
+        max_workers=max_workers,
+        use_processes=use_processes,
+        scan_workers=scan_workers,
     )
 
 
@@ -79,13 +100,21 @@ def build(glob, collection_config, overwrite, inputdir, outputdir, max_files):
 @click.option(
     "-g", "--glob", default="*", type=click.STRING, help="glob pattern to collect the geotiff files. example */*.tif"
 )
+@click.option(
+    "--scan-workers",
+    type=int,
+    default=1,
+    help="Number of threads that list the input directories at the same time, this helps on network file systems.",
+)
 @click.argument(
     "inputdir",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def list_tiffs(glob, inputdir):
+def list_tiffs(glob, inputdir, scan_workers):
     """List which geotiff files will be selected with this input dir and glob pattern."""
-    command_list_input_files(glob=glob, input_dir=inputdir)
+    from stacbuilder.builder import command_list_input_files
+
+    command_list_input_files(glob=glob, input_dir=inputdir, scan_workers=scan_workers)
 
 
 @cli.command()
@@ -99,23 +128,66 @@ def list_tiffs(glob, inputdir):
     help="Configuration file for the collection",
 )
 @click.option("-m", "--max-files", type=int, default=-1, help="Stop processing after this maximum number of files.")
-@click.option("-s", "--save-dataframe", is_flag=True, help="Also save the data to shapefile and geoparquet.")
+@click.option("-s", "--save-dataframe", is_flag=True, help="Also save the data to CSV and geoparquet.")
+@click.option("--save-shapefile", is_flag=True, help="With --save-dataframe, also save a shapefile (slow).")
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help="Keep the metadata in a cache on disk, so the next run only reads the files that changed.",
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    type=int,
+    default=None,
+    help="Number of workers that read the GeoTIFF metadata. Default: 4 threads per CPU (max 32) or 1 process per CPU.",
+)
+@click.option(
+    "--processes/--threads",
+    "use_processes",
+    default=False,
+    help="Read the metadata in worker processes instead of threads.",
+)
+@click.option(
+    "--scan-workers",
+    type=int,
+    default=1,
+    help="Number of threads that list the input directories at the same time, this helps on network file systems.",
+)
 @click.argument(
     "inputdir",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def list_metadata(collection_config, glob, inputdir, max_files, save_dataframe):
+def list_metadata(
+    collection_config,
+    glob,
+    inputdir,
+    max_files,
+    save_dataframe,
+    save_shapefile,
+    cache,
+    max_workers,
+    use_processes,
+    scan_workers,
+):
     """List intermediary metadata per GeoTIFFs.
 
-    You can optionally save the metadata as a shapefile and geoparquet so you
-    can inspect the bounding boxes as well as the data.
+    You can optionally save the metadata as CSV, geoparquet and a shapefile
+    so you can inspect the bounding boxes as well as the data.
     """
+    from stacbuilder.builder import command_list_metadata
+
     command_list_metadata(
         collection_config_path=collection_config,
         glob=glob,
         input_dir=inputdir,
         max_files=max_files,
         save_dataframe=save_dataframe,
+        save_shapefile=save_shapefile,
+        use_cache=cache,
+        max_workers=max_workers,
+        use_processes=use_processes,
+        scan_workers=scan_workers,
     )
 
 
@@ -130,23 +202,66 @@ def list_metadata(collection_config, glob, inputdir, max_files, save_dataframe):
     help="Configuration file for the collection",
 )
 @click.option("-m", "--max-files", type=int, default=-1, help="Stop processing after this maximum number of files.")
-@click.option("-s", "--save-dataframe", is_flag=True, help="Also save the data to shapefile and geoparquet.")
+@click.option("-s", "--save-dataframe", is_flag=True, help="Also save the data to CSV and geoparquet.")
+@click.option("--save-shapefile", is_flag=True, help="With --save-dataframe, also save a shapefile (slow).")
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help="Keep the metadata in a cache on disk, so the next run only reads the files that changed.",
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    type=int,
+    default=None,
+    help="Number of workers that read the GeoTIFF metadata. Default: 4 threads per CPU (max 32) or 1 process per CPU.",
+)
+@click.option(
+    "--processes/--threads",
+    "use_processes",
+    default=False,
+    help="Read the metadata in worker processes instead of threads.",
+)
+@click.option(
+    "--scan-workers",
+    type=int,
+    default=1,
+    help="Number of threads that list the input directories at the same time, this helps on network file systems.",
+)
 @click.argument(
     "inputdir",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def list_items(collection_config, glob, inputdir, max_files, save_dataframe):
+def list_items(
+    collection_config,
+    glob,
+    inputdir,
+    max_files,
+    save_dataframe,
+    save_shapefile,
+    cache,
+    max_workers,
+    use_processes,
+    scan_workers,
+):
     """List generated STAC items.
 
-    You can optionally save the metadata as a shapefile and geoparquet so you
-    can inspect the bounding boxes as well as the data.
+    You can optionally save the metadata as CSV, geoparquet and a shapefile
+    so you can inspect the bounding boxes as well as the data.
     """
+    from stacbuilder.builder import command_list_stac_items
+
     command_list_stac_items(
         collection_config_path=collection_config,
         glob=glob,
         input_dir=inputdir,
         max_files=max_files,
         save_dataframe=save_dataframe,
+        save_shapefile=save_shapefile,
+        use_cache=cache,
+        max_workers=max_workers,
+        use_processes=use_processes,
+        scan_workers=scan_workers,
     )
 
 
@@ -157,6 +272,8 @@ def show_collection(collection_file):
 
     You can use this to see if it can be loaded.
     """
+    from stacbuilder.builder import command_load_collection
+
     command_load_collection(collection_file)
 
 
@@ -165,6 +282,8 @@ def show_collection(collection_file):
 def validate(collection_file):
     """Run STAC validation on the collection file."""
 
+    from stacbuilder.builder import command_validate_collection
+
     command_validate_collection(collection_file)
 
 
@@ -190,6 +309,8 @@ def post_process(outputdir, collection_config, collection_file):
     You make have to do that many times when debugging postpreocessing
     and waiting for collections to be build is annoying.
     """
+    from stacbuilder.builder import command_post_process_collection
+
     command_post_process_collection(
         collection_file=collection_file, collection_config_path=collection_config, output_dir=outputdir
     )
@@ -224,6 +345,8 @@ def test_openeo(backend_url, out_dir, collection_file, bbox, epsg, max_extent_si
     if bbox:
         bbox = json.loads(bbox)
 
+    from stacbuilder.verify_openeo import verify_in_openeo
+
     verify_in_openeo(
         backend_url=backend_url,
         collection_path=collection_file,
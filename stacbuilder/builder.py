@@ -1,17 +1,29 @@
 import datetime as dt
+import fnmatch
+import functools
 import json
 import logging
+import operator
+import os
 import pprint
+import re
 import shutil
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import IntEnum, auto
 from itertools import islice
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Optional, Union, Protocol
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union, Protocol
 
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pydantic
 import pystac
+import shapely
 from shapely.geometry import shape
 from pystac import Asset, CatalogType, Collection, Extent, Item, SpatialExtent, TemporalExtent
 from pystac.errors import STACValidationError
@@ -31,9 +43,10 @@ from stacbuilder.pathparsers import (
     InputPathParserFactory,
 )
 from stacbuilder.config import AssetConfig, CollectionConfig, InputPathParserConfig
-from stacbuilder.metadata import Metadata
+from stacbuilder.metadata import Metadata, enter_local_gdal_env
+from stacbuilder.metadatacache import MetadataCache
 from stacbuilder.timezoneformat import TimezoneFormatConverter
-from stacbuilder.projections import reproject_bounding_box
+from stacbuilder.projections import get_crs, reproject_bounding_box
 
 
 _logger = logging.getLogger(__name__)
@@ -42,11 +55,19 @@ _logger = logging.getLogger(__name__)
 CLASSIFICATION_SCHEMA = "https://stac-extensions.github.io/classification/v1.0.0/schema.json"
 
 
-class SettingsInvalid(Exception):
-    pass
+PARQUET_COMPRESSION = "zstd"
+PARQUET_ROW_GROUP_SIZE = 50_000
+CSV_CHUNK_SIZE = 100_000
 
+# Maximum number of files that a worker process reads per task.
+MAX_PROCESS_CHUNK_SIZE = 64
 
-from enum import IntEnum, auto
+# Number of files that are looked up in the metadata cache at a time.
+CACHE_BATCH_SIZE = 10_000
+
+
+class SettingsInvalid(Exception):
+    pass
 
 
 class ProcessingLevels(IntEnum):
@@ -76,6 +97,114 @@ class InvalidOperation(Exception):
     pass
 
 
+def get_default_extent() -> Extent:
+    """Get the extent for a new collection, until it is updated from its items.
+
+    This used to be a class attribute, but then the timestamps were computed
+    when the module was imported instead of when the collection is created.
+    """
+    now = dt.datetime.utcnow()
+    return Extent(
+        SpatialExtent([-180.0, -90.0, 180.0, 90.0]),
+        TemporalExtent([[now - dt.timedelta(weeks=52), now]]),
+    )
+
+
+def _batched(values: Iterable[Any], batch_size: int) -> Iterable[List[Any]]:
+    """Split an iterable into lists of at most batch_size values."""
+    iterator = iter(values)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def _get_bbox_extremes(bboxes: List[List[float]]) -> Tuple[List[float], List[int]]:
+    """Get the bounding box that contains all bboxes, as [west, south, east, north].
+
+    Also returns, for each of those 4 sides, the index of the bbox that determines it.
+    """
+    coords = np.asarray(bboxes, dtype=np.float64)[:, :4]
+    indices = [
+        int(coords[:, 0].argmin()),
+        int(coords[:, 1].argmin()),
+        int(coords[:, 2].argmax()),
+        int(coords[:, 3].argmax()),
+    ]
+    return [float(coords[i, side]) for side, i in enumerate(indices)], indices
+
+
+def _records_to_columns(records: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Convert records to columns: one list of values per key.
+
+    pandas builds a DataFrame much faster from columns than from records, and
+    we never need to keep the full list of records in memory.
+    Like pd.DataFrame.from_records, the columns are in the order in which the
+    keys first appear, and missing values become NaN.
+    """
+    columns: Dict[str, List[Any]] = {}
+    num_records = 0
+    for record in records:
+        for key, value in record.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [np.nan] * num_records
+            column.append(value)
+        num_records += 1
+        for column in columns.values():
+            if len(column) < num_records:
+                column.append(np.nan)
+    return columns
+
+
+def _convert_columns_to_string(columns: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Convert datetimes and lists to strings, column by column, so they can be saved to a file."""
+
+    def to_string(val):
+        if isinstance(val, dt.datetime):
+            return val.isoformat()
+        if isinstance(val, list):
+            return json.dumps(val)
+        return val
+
+    return {key: [to_string(val) for val in values] for key, values in columns.items()}
+
+
+def _stac_items_to_geodataframe(items: Iterable[Item]) -> gpd.GeoDataFrame:
+    """Convert STAC items to a GeoDataFrame, going over the items only once.
+
+    The geometries and the EPSG code come from the columns, so we don't
+    need to keep a list of the items themselves.
+    """
+    return _stac_item_dicts_to_geodataframe(item.to_dict() for item in items)
+
+
+def _stac_item_dicts_to_geodataframe(item_dicts: Iterable[Dict[str, Any]]) -> gpd.GeoDataFrame:
+    """Same as _stac_items_to_geodataframe, for items that were already converted with Item.to_dict."""
+    columns = _records_to_columns(item_dicts)
+    if not columns:
+        raise InvalidOperation("There are no STAC items. Can not create a GeoDataFrame")
+
+    epsg = columns["properties"][0].get("proj:epsg", 4326)
+    shapes = _geojson_to_shapes(columns["geometry"])
+    return gpd.GeoDataFrame(_convert_columns_to_string(columns), crs=get_crs(epsg), geometry=shapes)
+
+
+def _geojson_to_shapes(geometries: List[Dict[str, Any]]) -> Union[np.ndarray, List[Any]]:
+    """Convert GeoJSON geometries to shapely geometries.
+
+    Our items have simple polygons, all with the same number of points, so
+    we can create all polygons at once with shapely.polygons. Any other
+    geometries are converted one by one.
+    """
+    if geometries and all(
+        geometry["type"] == "Polygon" and len(geometry["coordinates"]) == 1 for geometry in geometries
+    ):
+        rings = [geometry["coordinates"][0] for geometry in geometries]
+        num_points = len(rings[0])
+        if all(len(ring) == num_points for ring in rings):
+            return shapely.polygons(np.asarray(rings, dtype=np.float64))
+    return [shape(geometry) for geometry in geometries]
+
+
 class STACBuilder:
     """Builds a STAC collections for a dataset of GeoTIFF files in a directory.
 
@@ -83,18 +212,6 @@ class STACBuilder:
     Working on a more flexible solution.
     """
 
-    DEFAULT_EXTENT = Extent(
-        SpatialExtent([-180.0, -90.0, 180.0, 90.0]),
-        TemporalExtent(
-            [
-                [
-                    dt.datetime.utcnow() - dt.timedelta(weeks=52),
-                    dt.datetime.utcnow(),
-                ]
-            ]
-        ),
-    )
-
     def __init__(self, path_parser: Optional[InputPathParser] = None):
         self.input_dir: Path = None
         self.glob: str = "*"
@@ -108,6 +225,14 @@ class STACBuilder:
 
         self._collection_config: CollectionConfig = None
 
+        # Number of workers that read the metadata of the files, None uses the default of TiffMetadataCollector.
+        self.max_workers: Optional[int] = None
+        # Read the metadata in worker processes instead of threads.
+        self.use_processes: bool = False
+        # Number of threads that list the input directories, see FileCollectorConfig.
+        self.scan_workers: int = 1
+
+        self._file_collector: FileCollector = None
         self._input_files: List[Path] = []
         self._collection: Collection = None
 
@@ -168,23 +293,22 @@ class STACBuilder:
 
     def post_process_collection(self, collection_file: Path, output_dir: Optional[Path] = None):
         out_dir: Path = output_dir or collection_file.parent
-        new_coll_file, _ = self._create_post_proc_directory_structure(collection_file, out_dir)
-        self._convert_timezones_encoded_as_z(collection_file, out_dir)
+        # Load the item paths only once: each load reads the collection and all its item files.
+        item_paths = self.get_item_paths_for_coll_file(collection_file)
+        new_coll_file, _ = self._create_post_proc_directory_structure(collection_file, item_paths, out_dir)
+        self._convert_timezones_encoded_as_z(collection_file, item_paths, out_dir)
 
         self._override_collection_components(new_coll_file)
 
         # Check if the new file is still valid STAC.
         self.validate_collection(Collection.from_file(new_coll_file))
 
-    def _create_post_proc_directory_structure(self, collection_file: Path, output_dir: Optional[Path] = None):
-        in_place = False
-        if not output_dir:
-            in_place = True
-        elif output_dir.exists() and output_dir.samefile(collection_file.parent):
-            in_place = True
-
-        # converted_out_dir: Path = output_dir or collection_file.parent
-        item_paths = self.get_item_paths_for_coll_file(collection_file)
+    def _create_post_proc_directory_structure(
+        self, collection_file: Path, item_paths: List[Path], output_dir: Optional[Path] = None
+    ):
+        # Compare resolved paths rather than using Path.samefile: that stats both paths,
+        # which is slow on network file systems.
+        in_place = not output_dir or output_dir.resolve() == collection_file.parent.resolve()
 
         if in_place:
             converted_out_dir = collection_file.parent
@@ -203,10 +327,16 @@ class STACBuilder:
             relative_paths = [ip.relative_to(collection_file.parent) for ip in item_paths]
             new_item_paths = [output_dir / rp for rp in relative_paths]
 
-            sub_directories = set(p.parent for p in new_item_paths)
+            # Only create the deepest directories: makedirs creates their parents too.
+            # In reverse sorted order a parent usually comes right after its subdirectories,
+            # so we skip a directory when it is a parent of the one we just created.
+            sub_directories = sorted({str(p.parent) for p in new_item_paths}, reverse=True)
+            last_created = None
             for sub_dir in sub_directories:
-                if not sub_dir.exists():
-                    sub_dir.mkdir(parents=True)
+                if last_created and last_created.startswith(sub_dir + os.sep):
+                    continue
+                os.makedirs(sub_dir, exist_ok=True)
+                last_created = sub_dir
 
         return collection_converted_file, new_item_paths
 
@@ -217,19 +347,41 @@ class STACBuilder:
 
     @classmethod
     def get_item_paths_for_coll_file(cls, collection_file: Path) -> List[Path]:
-        collection = Collection.from_file(collection_file)
-        return cls.get_item_paths_for_collection(collection)
+        """Get the file paths of the STAC items in a collection file, including those of child catalogs.
+
+        This only reads the links from the JSON files, which is a lot faster than
+        loading the collection and all of its items with pystac.
+        To get the paths from a loaded collection, use get_item_paths_for_collection.
+        """
+        collection_file = Path(collection_file)
+        with open(collection_file, "r") as f_in:
+            data = json.load(f_in)
+
+        base_dir = os.path.abspath(collection_file.parent)
+        item_paths = []
+        for link in data.get("links", []):
+            rel = link.get("rel")
+            if rel not in ("item", "child"):
+                continue
+
+            # Same as pystac: relative links are relative to the file that contains them.
+            link_path = Path(os.path.abspath(os.path.join(base_dir, link["href"])))
+            if rel == "item":
+                item_paths.append(link_path)
+            else:
+                item_paths.extend(cls.get_item_paths_for_coll_file(link_path))
+
+        return item_paths
 
     @property
     def item_paths(self) -> List[Path]:
         """Get file paths for each STAC item in the collection."""
         return self.get_item_paths_for_collection(self.collection)
 
-    def _convert_timezones_encoded_as_z(self, collection_file: Path, output_dir: Path):
+    def _convert_timezones_encoded_as_z(self, collection_file: Path, item_paths: List[Path], output_dir: Path):
         print("Converting UTC timezones encoded as 'Z' to +00:00...")
         conv = TimezoneFormatConverter()
         out_dir = output_dir or collection_file.parent
-        item_paths = self.get_item_paths_for_coll_file(collection_file)
         conv.process_catalog(in_coll_path=collection_file, in_item_paths=item_paths, output_dir=out_dir)
 
     def _override_collection_components(self, collection_file: Path):
@@ -260,14 +412,38 @@ class STACBuilder:
 
     def collect_input_files(self) -> List[Path]:
         """Find all GeoTIFF files in the directory."""
-        input_files = (f for f in self.input_dir.glob(self.glob) if f.is_file())
-
-        if self.max_files_to_process > 0:
-            input_files = islice(input_files, self.max_files_to_process)
+        # FileCollector finds the files lazily, and with os.scandir instead of a stat call per file.
+        file_collector = FileCollector()
+        file_collector.setup(
+            FileCollectorConfig(
+                input_dir=self.input_dir,
+                glob=self.glob,
+                max_files=self.max_files_to_process,
+                max_workers=self.scan_workers,
+            )
+        )
+        file_collector.collect()
 
-        self._input_files = input_files
+        self._file_collector = file_collector
+        self._input_files = file_collector.input_files
         return self._input_files
 
+    def _iter_metadata(self) -> Iterable[Metadata]:
+        """Read the Metadata of each input file, in the same order as the files.
+
+        The files are read by a pool of threads while we are still finding the next ones.
+        """
+        if self._file_collector is None:
+            self.collect_input_files()
+        metadata_collector = TiffMetadataCollector(
+            self._file_collector,
+            self._get_input_path_parser(),
+            max_workers=self.max_workers,
+            use_processes=self.use_processes,
+            read_href_modifier=self._read_href_modifier,
+        )
+        return metadata_collector.collect_iter()
+
     @property
     def input_files(self) -> List[Path]:
         return self._input_files or []
@@ -343,14 +519,7 @@ class STACBuilder:
         This is a utility method for troubleshooting.
         """
         self.validate_builder_settings(level=ProcessingLevels.COLLECT_METADATA)
-        extract_href_info = self._get_input_path_parser()
-        for file in self.input_files:
-            metadata = Metadata(
-                href=str(file),
-                extract_href_info=extract_href_info,
-                read_href_modifier=self._read_href_modifier,
-            )
-            yield metadata
+        yield from self._iter_metadata()
 
     def try_parse_items(self):
         """Parse each file into a pystac.Item, without creating an collection.
@@ -358,8 +527,10 @@ class STACBuilder:
         This is a utility method for troubleshooting.
         """
         self.validate_builder_settings(level=ProcessingLevels.COLLECT_METADATA)
-        for file in self.input_files:
-            item = self.create_item(file)
+        item_assets_configs = self.item_assets_configs
+        asset_definitions = self.get_item_assets_definitions()
+        for metadata in self._iter_metadata():
+            item = self._create_item_from_metadata(metadata, item_assets_configs, asset_definitions)
             # Skip the yield when we found spurious file that are not items that
             # we know from the collection configuration.
             if item:
@@ -385,25 +556,8 @@ class STACBuilder:
     #     """
     #     return pd.DataFrame.from_records(it.to_dict() for it in self.try_parse_items())
 
-    def convert_fields_to_string(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        out_records = [dict(rec) for rec in records]
-        for rec in out_records:
-            for key, val in rec.items():
-                if isinstance(val, dt.datetime):
-                    rec[key] = val.isoformat()
-                elif isinstance(val, list):
-                    rec[key] = json.dumps(val)
-        return out_records
-
     def get_stac_items_as_geodataframe(self) -> gpd.GeoDataFrame:
-        item_list = list(self.get_stac_items())
-        if not item_list:
-            raise InvalidOperation("There are no STAC items. Can not create a GeoDataFrame")
-
-        epsg = item_list[0].properties.get("proj:epsg", 4326)
-        records = self.convert_fields_to_string(i.to_dict() for i in item_list)
-        shapes = [shape(item.geometry) for item in item_list]
-        return gpd.GeoDataFrame(records, crs=epsg, geometry=shapes)
+        return _stac_items_to_geodataframe(self.get_stac_items())
 
     def get_stac_items(self) -> Iterable[pystac.Item]:
         if not self.collection:
@@ -416,8 +570,13 @@ class STACBuilder:
         self.validate_builder_settings()
         self._create_collection()
 
-        for file in self.input_files:
-            item = self.create_item(file)
+        # Look these up once, rather than for every item.
+        item_assets_configs = self.item_assets_configs
+        asset_definitions = self.get_item_assets_definitions()
+        # All items of one build get the same creation time.
+        created = dt.datetime.utcnow()
+        for metadata in self._iter_metadata():
+            item = self._create_item_from_metadata(metadata, item_assets_configs, asset_definitions, created)
             if item is not None:
                 item.validate()
                 self._collection.add_item(item)
@@ -437,11 +596,8 @@ class STACBuilder:
             print(f"WARNING: Item CRSs should all be the same but different codes were found {epsg_set=}")
         epsg = list(epsg_set)[0]
 
-        min_x = min(p[0] for p in proj_bounds)
-        min_y = min(p[1] for p in proj_bounds)
-        max_x = max(p[2] for p in proj_bounds)
-        max_y = max(p[3] for p in proj_bounds)
-        coll_proj_bbox = [min_x, min_y, max_x, max_y]
+        coll_proj_bbox, _ = _get_bbox_extremes(proj_bounds)
+        min_x, min_y, max_x, max_y = coll_proj_bbox
         print(f"{coll_proj_bbox=}")
 
         bbox_lat_lon = reproject_bounding_box(min_x, min_y, max_x, max_y, from_crs=epsg, to_crs="epsg:4326")
@@ -504,7 +660,7 @@ class STACBuilder:
             description=coll_config.description,
             keywords=coll_config.keywords,
             providers=self.providers,
-            extent=self.DEFAULT_EXTENT,
+            extent=get_default_extent(),
             # summaries=constants.SUMMARIES,
         )
         # TODO: Add support for summaries.
@@ -544,6 +700,7 @@ class STACBuilder:
         tiff_path: Path,
         # read_href_modifier: Optional[ReadHrefModifier] = None,
         # extract_href_info: Optional[Callable[[str], dict]] = None,
+        created: Optional[dt.datetime] = None,
     ) -> Item:
         """Create a STAC Item with one or two assets.
 
@@ -551,18 +708,51 @@ class STACBuilder:
             read_href_modifier (Callable[[str], str]): An optional function to
                 modify the MTL and USGS STAC hrefs (e.g. to add a token to a url).
             raster_footprint (bool): Flag to use the footprint of valid (not nodata)
+            created (datetime): The creation time to set on the item.
+                When it is None, the current time is used.
 
         Returns:
             Item: STAC Item object representing the forest carbon monitoring tile
         """
-        extract_href_info = self._get_input_path_parser()
+        return self._create_item(
+            tiff_path,
+            self._get_input_path_parser(),
+            self._read_href_modifier,
+            self.item_assets_configs,
+            self.get_item_assets_definitions(),
+            created,
+        )
+
+    def _create_item(
+        self,
+        tiff_path: Path,
+        extract_href_info: InputPathParser,
+        read_href_modifier: Optional[ReadHrefModifier],
+        item_assets_configs: Dict[str, AssetConfig],
+        asset_definitions: Dict[str, AssetDefinition],
+        created: Optional[dt.datetime] = None,
+    ) -> Item:
+        """Create a STAC Item, for internal use.
+
+        Everything that is the same for each item is passed in, so loops over
+        many files can look it up once.
+        """
         metadata = Metadata(
             href=str(tiff_path),
             extract_href_info=extract_href_info,
-            read_href_modifier=self._read_href_modifier,
+            read_href_modifier=read_href_modifier,
         )
+        return self._create_item_from_metadata(metadata, item_assets_configs, asset_definitions, created)
 
-        if metadata.item_type not in self.item_assets_configs:
+    def _create_item_from_metadata(
+        self,
+        metadata: Metadata,
+        item_assets_configs: Dict[str, AssetConfig],
+        asset_definitions: Dict[str, AssetDefinition],
+        created: Optional[dt.datetime] = None,
+    ) -> Optional[Item]:
+        """Create a STAC Item from Metadata that was already read, see _create_item."""
+        if metadata.item_type not in item_assets_configs:
             _logger.warning(
                 "Found an unknown item type, not defined in collection configuration: "
                 f"{metadata.item_type}, returning item=None"
@@ -585,17 +775,18 @@ class STACBuilder:
             },
         )
 
-        description = self.item_assets_configs[metadata.item_type].description
+        description = item_assets_configs[metadata.item_type].description
         item.common_metadata.description = description
         # item.common_metadata.description = self.collection_description
 
-        item.common_metadata.created = dt.datetime.utcnow()
+        item.common_metadata.created = created or dt.datetime.utcnow()
 
         # item.common_metadata.mission = constants.MISSION
         # item.common_metadata.platform = constants.PLATFORM
         # item.common_metadata.instruments = constants.INSTRUMENTS
 
-        item.add_asset(metadata.item_type, self.create_asset(metadata))
+        asset_def: AssetDefinition = asset_definitions[metadata.item_type]
+        item.add_asset(metadata.item_type, asset_def.create_asset(metadata.href))
 
         item_proj = ItemProjectionExtension.ext(item, add_if_missing=True)
         item_proj.epsg = metadata.proj_epsg
@@ -662,6 +853,8 @@ class FileCollectorConfig(pydantic.BaseModel):
     input_dir: Path
     glob: Optional[str] = "*"
     max_files: int = -1
+    # Number of threads that list directories at the same time, this helps on network file systems.
+    max_workers: int = 1
 
 
 class DataCollector(Protocol):
@@ -677,6 +870,177 @@ class DataCollector(Protocol):
         ...
 
 
+def _scandir_glob(directory: str, segments: List[str], max_workers: int = 1) -> Iterable[str]:
+    """Find the files in a directory that match a glob pattern, given as a list of path segments.
+
+    Path.glob followed by Path.is_file needs an extra stat call for each file.
+    os.scandir already gets the file type from the directory listing, so in
+    most cases there is no stat call at all.
+
+    We walk the tree with a stack of (directory, segment index) instead of
+    recursion, and we visit the directories in the same order as Path.glob.
+    A "**" segment matches the directory itself and all its subdirectories,
+    but like Path.glob we don't descend into symlinks to directories.
+    Unlike Path.glob, each file is only returned once: when symlinks lead to
+    the same file more than once, we keep the path without symlinks, or else
+    the first path we find.
+    The pattern may contain at most one "**" and it can not be the last segment.
+    Each directory is only listed once for each segment that it has to match.
+
+    With max_workers > 1 a thread pool lists the directories that are at the
+    top of the stack, before we get to them. On network file systems each
+    listing waits for the server, so this keeps several requests going at
+    once. The files still come out in the same order.
+    """
+    segments = tuple(segments)
+    real_root = None
+    seen_targets = set()
+    # Each entry is [directory, segment index, reached through a symlink, future of its listing or None].
+    stack = [[directory, 0, False, None]]
+    executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    prefetch = 2 * max_workers
+    num_in_flight = 0
+    try:
+        while stack:
+            current_dir, index, via_symlink, future = stack.pop()
+            if future is not None:
+                num_in_flight -= 1
+                listing = future.result()
+            else:
+                listing = _match_directory(current_dir, segments, index)
+            files, matched_dirs, recursive_dirs = listing
+
+            for path, is_symlink in files:
+                if via_symlink or is_symlink:
+                    # A symlink can lead to a file that we also find without the symlink,
+                    # or that another symlink leads to as well. Only these paths need the
+                    # extra stat calls of realpath, all other paths are unique already.
+                    if real_root is None:
+                        real_root = os.path.realpath(directory)
+                    target = os.path.realpath(path)
+                    if target in seen_targets or _is_found_without_symlinks(target, real_root, segments):
+                        continue
+                    seen_targets.add(target)
+                yield path
+
+            # Path.glob handles all matches in the current directory before it goes on
+            # with the subdirectories of "**". The stack is last in, first out, so we push
+            # those first, and both lists in reverse to keep the order of the listing.
+            stack.extend([d, i, via_symlink or s, None] for d, i, s in reversed(recursive_dirs))
+            stack.extend([d, i, via_symlink or s, None] for d, i, s in reversed(matched_dirs))
+
+            if executor is None:
+                continue
+            # Start listing the directories that we will visit next.
+            for entry in reversed(stack):
+                if num_in_flight >= prefetch:
+                    break
+                if entry[3] is None:
+                    entry[3] = executor.submit(_match_directory, entry[0], segments, entry[1])
+                    num_in_flight += 1
+    finally:
+        if executor is not None:
+            # When the caller stops early, don't list the directories that are still waiting.
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _is_found_without_symlinks(path: str, root: str, segments: Tuple[str, ...]) -> bool:
+    """Check if _scandir_glob finds path without following any symlinks.
+
+    Both path and root must be real paths, so path has no symlinks below root.
+    """
+    try:
+        relative = os.path.relpath(path, root)
+    except ValueError:
+        # On Windows, path and root are on different drives.
+        return False
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return False
+
+    parts = relative.split(os.sep)
+    if "**" not in segments:
+        return len(parts) == len(segments) and _match_parts(segments, parts)
+
+    # "**" is never the last segment, so there is always a tail.
+    index = segments.index("**")
+    head, tail = segments[:index], segments[index + 1 :]
+    if len(parts) < len(head) + len(tail):
+        return False
+    return _match_parts(head, parts[: len(head)]) and _match_parts(tail, parts[-len(tail) :])
+
+
+def _match_parts(segments: Tuple[str, ...], parts: List[str]) -> bool:
+    return all(_get_segment_matcher(s)(p) for s, p in zip(segments, parts))
+
+
+def _match_directory(directory: str, segments: Tuple[str, ...], index: int) -> Tuple[tuple, tuple, tuple]:
+    """Match the entries of one directory against segments[index], for _scandir_glob.
+
+    Returns the matching files, the matching directories with the index of
+    the segment they have to match next, and for "**" the subdirectories that
+    have to match the "**" again. Each file and directory comes with a flag
+    that tells if it is a symlink.
+    """
+    pattern = segments[index]
+    if not _is_wildcard_pattern(pattern):
+        # Like Path.glob, a segment without wildcards is checked with a single stat
+        # instead of listing the whole directory.
+        path = os.path.join(directory, pattern)
+        if index == len(segments) - 1:
+            return (((path, os.path.islink(path)),) if os.path.isfile(path) else ()), (), ()
+        return (), (((path, index + 1, os.path.islink(path)),) if os.path.isdir(path) else ()), ()
+
+    try:
+        # Close the directory before we descend into the subdirectories.
+        with os.scandir(directory) as entries:
+            entries = list(entries)
+    except OSError:
+        # Same as Path.glob: skip directories that we can not read.
+        return (), (), ()
+
+    recursive_dirs = ()
+    if segments[index] == "**":
+        recursive_dirs = tuple((e.path, index, False) for e in entries if e.is_dir() and not e.is_symlink())
+        # The segment after "**" also applies to the current directory.
+        index += 1
+
+    matches_pattern = _get_segment_matcher(segments[index])
+    is_last = index == len(segments) - 1
+    files = []
+    matched_dirs = []
+    for entry in entries:
+        if not matches_pattern(entry.name):
+            continue
+        if is_last:
+            if entry.is_file():
+                files.append((entry.path, entry.is_symlink()))
+        elif entry.is_dir():
+            matched_dirs.append((entry.path, index + 1, entry.is_symlink()))
+
+    return tuple(files), tuple(matched_dirs), recursive_dirs
+
+
+def _is_wildcard_pattern(pattern: str) -> bool:
+    # Same check as pathlib, "**" counts as a wildcard too.
+    return "*" in pattern or "?" in pattern or "[" in pattern
+
+
+@functools.lru_cache(maxsize=256)
+def _get_segment_matcher(pattern: str) -> Callable[[str], Any]:
+    """Get a function that matches names to one segment of a glob, same rules as fnmatch.fnmatchcase.
+
+    fnmatchcase looks up the compiled pattern again for each name it matches,
+    this way we only do that once per directory.
+    The most common patterns, "*" and "*.tif", don't need a regex at all.
+    """
+    if pattern == "*":
+        return bool
+    suffix = pattern[1:]
+    if pattern.startswith("*") and not _is_wildcard_pattern(suffix):
+        return operator.methodcaller("endswith", suffix)
+    return re.compile(fnmatch.translate(pattern)).match
+
+
 class FileCollector(DataCollector):
     """Collects geotiff files that match a glob, from a directory"""
 
@@ -684,21 +1048,43 @@ class FileCollector(DataCollector):
         self.input_dir: Path = None
         self.glob: str = "*"
         self.max_files: int = -1
+        self.max_workers: int = 1
         self._input_files = None
 
     def setup(self, config: FileCollectorConfig):
         self.input_dir = config.input_dir
         self.glob = config.glob
         self.max_files = config.max_files
+        self.max_workers = config.max_workers
         self.reset()
 
     def collect(self):
-        input_files = (f for f in self.input_dir.glob(self.glob) if f.is_file())
+        self._input_files = (Path(f) for f in self.iter_file_paths())
 
-        if self.max_files > 0:
-            input_files = islice(input_files, self.max_files)
+    def iter_file_paths(self) -> Iterable[str]:
+        """Find the files the same way as collect, but as strings instead of Path objects.
 
-        self._input_files = input_files
+        Use this when you only need the paths as text, it saves creating a Path for every file.
+        The files are not stored in input_files.
+        """
+        file_paths = self._find_file_paths()
+        if self.max_files > 0:
+            file_paths = islice(file_paths, self.max_files)
+        return file_paths
+
+    def _find_file_paths(self) -> Iterable[str]:
+        segments = [s for s in self.glob.split("/") if s not in ("", ".")]
+        if (
+            not segments
+            or ".." in segments
+            or segments[-1] == "**"
+            or segments.count("**") > 1
+            or any("**" in s and s != "**" for s in segments)
+        ):
+            # The scandir version does not support these patterns, leave them to pathlib.
+            return (str(f) for f in self.input_dir.glob(self.glob) if f.is_file())
+
+        return _scandir_glob(str(self.input_dir), segments, max_workers=self.max_workers)
 
     def has_collected(self) -> bool:
         return self._input_files is not None
@@ -711,12 +1097,142 @@ class FileCollector(DataCollector):
         return self._input_files or []
 
 
+def _get_default_max_workers(use_processes: bool = False) -> int:
+    """Get the default number of workers to read the metadata of files.
+
+    Reading the metadata is mostly waiting for I/O: each thread opens its own
+    file with rasterio, and GDAL releases the GIL, so more threads than CPUs
+    still helps. For processes we use one per CPU.
+    """
+    num_cpus = os.cpu_count() or 1
+    if use_processes:
+        return num_cpus
+    return min(32, 4 * num_cpus)
+
+
+def _map_in_parallel(
+    func: Callable[[Any], Any],
+    values: Iterable[Any],
+    max_workers: int = 1,
+    use_processes: bool = False,
+    prefetch: Optional[int] = None,
+    initializer: Optional[Callable[[], Any]] = None,
+) -> Iterable[Any]:
+    """Apply func to each value, using a pool of workers when max_workers is more than 1.
+
+    The results are returned in the same order as the values.
+    With use_processes=True it uses a process pool, so func, its arguments
+    and its results must be picklable.
+
+    The results are produced lazily: at most prefetch tasks are being processed
+    at a time, and each result we hand out makes room for the next task.
+    This keeps enough reads in flight to hide the latency of slow storage,
+    without having a task and a result for every file in memory at once.
+    By default prefetch is twice the number of workers.
+    With processes a task is a chunk of values, see _map_in_processes.
+
+    Each worker of the pool calls initializer once before it starts, like the
+    initializer of concurrent.futures executors. Without a pool it is not called.
+    """
+    if max_workers <= 1:
+        # Starting a pool for a single worker is only overhead.
+        return map(func, values)
+
+    if prefetch is None:
+        prefetch = 2 * max_workers
+    prefetch = max(1, prefetch)
+
+    if use_processes:
+        return _map_in_processes(func, values, max_workers=max_workers, prefetch=prefetch, initializer=initializer)
+    return _map_in_threads(func, values, max_workers=max_workers, prefetch=prefetch, initializer=initializer)
+
+
+def _map_in_processes(
+    func: Callable[[Any], Any],
+    values: Iterable[Any],
+    max_workers: int,
+    prefetch: int,
+    initializer: Optional[Callable[[], Any]] = None,
+) -> Iterable[Any]:
+    """Sliding window over a process pool, see _map_in_parallel.
+
+    Sending the values to another process one by one is slow, so we send them
+    in chunks, taken from values as we go. The chunks start small, so the first
+    results come back soon, and double in size up to MAX_PROCESS_CHUNK_SIZE values.
+    """
+    _logger.debug(f"Mapping with {max_workers} processes and up to {prefetch} chunks in flight")
+    executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer)
+    chunks = _iter_growing_chunks(values, MAX_PROCESS_CHUNK_SIZE)
+    chunk_results = _map_with_executor(executor, functools.partial(_apply_to_chunk, func), chunks, prefetch)
+    try:
+        for results in chunk_results:
+            yield from results
+    finally:
+        # Shut the pool down right away when the caller stops early.
+        chunk_results.close()
+
+
+def _map_in_threads(
+    func: Callable[[Any], Any],
+    values: Iterable[Any],
+    max_workers: int,
+    prefetch: int,
+    initializer: Optional[Callable[[], Any]] = None,
+) -> Iterable[Any]:
+    """Sliding window over a thread pool, see _map_in_parallel."""
+    _logger.debug(f"Mapping with {max_workers} threads and up to {prefetch} tasks in flight")
+    executor = ThreadPoolExecutor(max_workers=max_workers, initializer=initializer)
+    yield from _map_with_executor(executor, func, values, prefetch)
+
+
+def _map_with_executor(
+    executor: Executor, func: Callable[[Any], Any], values: Iterable[Any], prefetch: int
+) -> Iterable[Any]:
+    """Submit func for each value to executor, with at most prefetch tasks in flight, and shut it down at the end."""
+    pending = deque()
+    try:
+        for value in values:
+            pending.append(executor.submit(func, value))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # When the caller stops early, don't start the tasks that are still waiting.
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _iter_growing_chunks(values: Iterable[Any], max_chunk_size: int) -> Iterable[List[Any]]:
+    """Split an iterable into lists of 1, 2, 4, ... values, up to max_chunk_size values each."""
+    iterator = iter(values)
+    chunk_size = 1
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+        chunk_size = min(2 * chunk_size, max_chunk_size)
+
+
+def _apply_to_chunk(func: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    # At module level, so it can be sent to a worker process.
+    return [func(value) for value in chunk]
+
+
 class MetadataCollector(DataCollector):
     """Base class for collector that gets Metadata objects from a source"""
 
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = False, prefetch: Optional[int] = None):
         self._metadata_list: List[Metadata] = None
 
+        # Reading the metadata of many files can be done in parallel.
+        # With use_processes=False it uses threads, otherwise processes.
+        # max_workers=None uses a default that suits the type of worker.
+        if max_workers is None:
+            max_workers = _get_default_max_workers(use_processes)
+        self.max_workers: int = max_workers
+        self.use_processes: bool = use_processes
+        # How many tasks can be in flight at the same time, the rest waits its turn.
+        # None uses twice the number of workers, so a worker never waits for its next file.
+        self.prefetch: Optional[int] = prefetch
+
     def collect(self):
         pass
 
@@ -739,30 +1255,42 @@ class GeoTiffToMetaData:
     parse large datasets more efficiently.
     """
 
-    def __init__(self, path_parser: InputPathParser) -> None:
+    def __init__(self, path_parser: InputPathParser, read_href_modifier: Optional[ReadHrefModifier] = None) -> None:
         self._path_parser = path_parser
+        self._read_href_modifier = read_href_modifier
 
     def process(self, file: Path) -> Metadata:
         return Metadata(
             href=str(file),
             extract_href_info=self._path_parser,
-            read_href_modifier=None,
+            read_href_modifier=self._read_href_modifier,
         )
 
 
 class TiffMetadataCollector(MetadataCollector):
     """Collects Metadata objects for TIFF files.
 
-    This is closer to the original design and a bit simpler to implement,
-    but not as efficient or flexible.
-    Probably won't keep this class.
+    STACBuilder and GeoTiffPipeline use this to read the metadata of their
+    input files with a pool of workers.
     """
 
-    def __init__(self, file_collector: FileCollector, path_parser: InputPathParser):
-        super().__init__()
+    def __init__(
+        self,
+        file_collector: FileCollector,
+        path_parser: InputPathParser,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        cache: Optional[MetadataCache] = None,
+        prefetch: Optional[int] = None,
+        read_href_modifier: Optional[ReadHrefModifier] = None,
+    ):
+        super().__init__(max_workers=max_workers, use_processes=use_processes, prefetch=prefetch)
         self._file_collector = file_collector
         self._path_parser = path_parser
-        self._processor = GeoTiffToMetaData(path_parser)
+        self._processor = GeoTiffToMetaData(path_parser, read_href_modifier=read_href_modifier)
+
+        # Optional persistent cache, so files that did not change don't have to be read again.
+        self._cache = cache
 
     def can_run(self):
         if not isinstance(self._file_collector, FileCollector):
@@ -783,14 +1311,60 @@ class TiffMetadataCollector(MetadataCollector):
         return self._file_collector.input_files
 
     def collect(self):
-        self.pre_run_check()
         self.reset()
+        self._metadata_list = list(self.collect_iter())
+
+    def collect_iter(self) -> Iterable[Metadata]:
+        """Same as collect, but yield each Metadata as soon as it is available, instead of storing a list.
+
+        The Metadata come in the same order as the input files.
+        This does not change the result of the metadata property.
+        """
+        self.pre_run_check()
         self._file_collector.collect()
-        self._metadata_list = []
 
-        for file in self.input_files:
-            metadata = self._processor.process(file)
-            self._metadata_list.append(metadata)
+        if not self._cache:
+            # Pass the files on as the file collector finds them, so the workers
+            # already read the first files while we are still walking the directories.
+            yield from self._read_metadata(self.input_files)
+            return
+
+        num_files = num_cached = 0
+        with self._cache:
+            # Go over the files in batches, so we don't have to find all files before
+            # the workers can start reading, and we never have the cached metadata of
+            # all files in memory.
+            for files in _batched(self.input_files, CACHE_BATCH_SIZE):
+                # Stat each file only once, for both looking it up and storing it.
+                # Taking the key before we read the file also means that a file that changes
+                # while we read it is stored under its old key, so it will be read again next time.
+                keys = [self._cache.get_key(file) for file in files]
+                cached_metadata = [self._cache.get(file, key) for file, key in zip(files, keys)]
+                missing_files = [file for file, metadata in zip(files, cached_metadata) if metadata is None]
+                num_files += len(files)
+                num_cached += len(files) - len(missing_files)
+
+                new_metadata = iter(self._read_metadata(missing_files))
+                for file, key, metadata in zip(files, keys, cached_metadata):
+                    if metadata is None:
+                        metadata = next(new_metadata)
+                        self._cache.set(file, metadata, key)
+                    yield metadata
+
+        _logger.info(f"Found metadata for {num_cached} of {num_files} files in cache")
+
+    def _read_metadata(self, files: Iterable[Path]) -> Iterable[Metadata]:
+        return _map_in_parallel(
+            self._processor.process,
+            files,
+            max_workers=self.max_workers,
+            use_processes=self.use_processes,
+            prefetch=self.prefetch,
+            # Set up GDAL once per worker, rather than once for each file it opens.
+            # The settings end with the worker, when _map_in_parallel shuts its pool down.
+            # Without a pool, Metadata sets up GDAL for each file in the current thread instead.
+            initializer=enter_local_gdal_env,
+        )
 
 
 class GeoTiffToSTACItem:
@@ -809,18 +1383,36 @@ class GeoTiffToSTACItem:
         self._path_parser = path_parser
         self.item_assets_configs = item_assets_configs
 
+    @property
+    def item_assets_configs(self) -> Dict[str, AssetConfig]:
+        return self._item_assets_configs
+
+    @item_assets_configs.setter
+    def item_assets_configs(self, value: Dict[str, AssetConfig]) -> None:
+        self._item_assets_configs = value
+        # The asset definitions depend on the configs, so they have to be created again.
+        self._asset_definitions = None
+
     def setup(self, collection_config: CollectionConfig, file_coll_cfg: FileCollectorConfig):
         self._path_parser = InputPathParserFactory.from_config(collection_config.input_path_parser)
         self._file_collector = FileCollector()
         self._file_collector.setup(file_coll_cfg)
 
-    def process(self, file: Path) -> Metadata:
+    def process(self, file: Path, created: Optional[dt.datetime] = None) -> Optional[Item]:
+        """Create the STAC item for file.
+
+        :param created: the creation time for the item, defaults to the current time.
+            Pass the same time for all items of one run, rather than getting it for each item.
+        """
         metadata = Metadata(
             href=str(file),
             extract_href_info=self._path_parser,
             read_href_modifier=None,
         )
+        return self.create_item(metadata, created)
 
+    def create_item(self, metadata: Metadata, created: Optional[dt.datetime] = None) -> Optional[Item]:
+        """Create the STAC item from Metadata that was already extracted, see process."""
         if metadata.item_type not in self.item_assets_configs:
             _logger.warning(
                 "Found an unknown item type, not defined in collection configuration: "
@@ -847,7 +1439,7 @@ class GeoTiffToSTACItem:
         description = self.item_assets_configs[metadata.item_type].description
         item.common_metadata.description = description
 
-        item.common_metadata.created = dt.datetime.utcnow()
+        item.common_metadata.created = created or dt.datetime.utcnow()
 
         # TODO: support optional parts: these fields are recommended but they are also not always relevant or present.
         # item.common_metadata.mission = constants.MISSION
@@ -875,16 +1467,27 @@ class GeoTiffToSTACItem:
     def _create_asset(self, metadata: Metadata) -> Asset:
         asset_defs = self._get_item_assets_definitions()
         asset_def: AssetDefinition = asset_defs[metadata.item_type]
-        return asset_def.create_asset(metadata.href)
-
-    def _get_item_assets_definitions(self) -> List[AssetDefinition]:
-        asset_definitions = {}
-        for band_name, asset_config in self.item_assets_configs.items():
-            asset_def: AssetDefinition = asset_config.to_asset_definition()
-            # asset_def.owner = self.collection
-            asset_definitions[band_name] = asset_def
-
-        return asset_definitions
+        asset = asset_def.create_asset(metadata.href)
+        # create_asset hands out the lists of the definition itself, and the definition is shared
+        # by all items, so give each asset its own copy of those.
+        if asset.roles is not None:
+            asset.roles = list(asset.roles)
+        eo_bands = asset.extra_fields.get("eo:bands")
+        if eo_bands is not None:
+            asset.extra_fields["eo:bands"] = [dict(band) for band in eo_bands]
+        return asset
+
+    def _get_item_assets_definitions(self) -> Dict[str, AssetDefinition]:
+        # They are the same for every item, so only create them once.
+        if self._asset_definitions is None:
+            asset_definitions = {}
+            for band_name, asset_config in self.item_assets_configs.items():
+                asset_def: AssetDefinition = asset_config.to_asset_definition()
+                # asset_def.owner = self.collection
+                asset_definitions[band_name] = asset_def
+            self._asset_definitions = asset_definitions
+
+        return self._asset_definitions
 
 
 class CreateSTACCollection:
@@ -948,7 +1551,7 @@ class CreateSTACCollection:
             description=coll_config.description,
             keywords=coll_config.keywords,
             providers=self.providers,
-            extent=self.DEFAULT_EXTENT,
+            extent=get_default_extent(),
             # summaries=constants.SUMMARIES,
         )
         # TODO: Add support for summaries.
@@ -980,18 +1583,40 @@ class GeoTiffPipeline:
     """
 
     def __init__(
-        self, file_collector: FileCollector, path_parser: InputPathParser, item_assets_configs: Dict[str, AssetConfig]
+        self,
+        file_collector: FileCollector,
+        path_parser: InputPathParser,
+        item_assets_configs: Dict[str, AssetConfig],
+        metadata_cache: Optional[MetadataCache] = None,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
     ) -> None:
 
         self._file_collector = file_collector
         self._path_parser = path_parser
         self._item_assets_configs = item_assets_configs
 
+        # Optional persistent cache, so files that did not change don't have to be read again.
+        self._metadata_cache = metadata_cache
+
+        # Number of workers that read the metadata, None uses the default of TiffMetadataCollector.
+        self.max_workers = max_workers
+        # Read the metadata in worker processes instead of threads.
+        self.use_processes = use_processes
+
         self._stac_item_processor = None
 
     @staticmethod
-    def from_config(collection_config: CollectionConfig, file_coll_cfg: FileCollectorConfig) -> "GeoTiffPipeline":
-        pipeline = GeoTiffPipeline(None, None, None)
+    def from_config(
+        collection_config: CollectionConfig,
+        file_coll_cfg: FileCollectorConfig,
+        metadata_cache: Optional[MetadataCache] = None,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+    ) -> "GeoTiffPipeline":
+        pipeline = GeoTiffPipeline(
+            None, None, None, metadata_cache=metadata_cache, max_workers=max_workers, use_processes=use_processes
+        )
         pipeline.setup(collection_config, file_coll_cfg)
         return pipeline
 
@@ -1014,57 +1639,88 @@ class GeoTiffPipeline:
             yield file
 
     def get_metadata(self) -> Iterable[Metadata]:
-        processor = GeoTiffToMetaData(self._path_parser)
-        self._file_collector.collect()
-
-        for file in self.get_input_files():
-            metadata = processor.process(file)
+        for _, metadata in self._iter_metadata_with_source():
             yield metadata
 
+    def _iter_metadata_with_source(self) -> Iterable[Tuple[Path, Metadata]]:
+        # The collector reads the files with a pool of workers, while the file collector is still finding them.
+        metadata_collector = TiffMetadataCollector(
+            self._file_collector,
+            self._path_parser,
+            max_workers=self.max_workers,
+            use_processes=self.use_processes,
+            cache=self._metadata_cache,
+        )
+        for metadata in metadata_collector.collect_iter():
+            yield Path(metadata.href), metadata
+
     def get_stac_items(self):
+        for _, item in self.iter_stac_items_with_source():
+            yield item
+
+    def iter_stac_items_with_source(self) -> Iterable[Tuple[Path, Optional[Item]]]:
+        """Same as get_stac_items, but yield each item together with the file it came from.
+
+        The item is None when the file could not be converted, so you can
+        tell which files failed without collecting the input files again.
+        The items are created from get_metadata, so they also use the metadata cache.
+        """
         self._setup_interals()
 
         processor = self._stac_item_processor
-        self._file_collector.collect()
-        for file in self.get_input_files():
-            yield processor.process(file)
+        # All items of one run get the same creation time.
+        created = dt.datetime.utcnow()
+        for file, metadata in self._iter_metadata_with_source():
+            yield file, processor.create_item(metadata, created)
 
     def get_metadata_as_geodataframe(self) -> gpd.GeoDataFrame:
-        meta_list = list(self.get_metadata())
-        if not meta_list:
+        gdf = self._metadata_to_geodataframe(self.get_metadata())
+        if gdf.empty:
             raise InvalidOperation("There are no STAC items. Can not create a GeoDataFrame")
 
-        epsg = meta_list[0].proj_epsg
-        geoms = [m.proj_geometry_shapely for m in meta_list]
-        records = self.convert_fields_to_string(m.to_dict() for m in meta_list)
+        return gdf
 
-        return gpd.GeoDataFrame(records, crs=epsg, geometry=geoms)
+    def iter_metadata_as_geodataframes(
+        self, batch_size: int = 50_000, metadata: Optional[Iterable[Metadata]] = None
+    ) -> Iterable[gpd.GeoDataFrame]:
+        """Same as get_metadata_as_geodataframe, but split into GeoDataFrames of at most batch_size rows.
 
-    def convert_fields_to_string(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        out_records = [dict(rec) for rec in records]
-        for rec in out_records:
-            for key, val in rec.items():
-                if isinstance(val, dt.datetime):
-                    rec[key] = val.isoformat()
-                elif isinstance(val, list):
-                    rec[key] = json.dumps(val)
-        return out_records
+        Only one batch of metadata is kept in memory at a time.
+        The index continues from one batch to the next.
+        If you are already going over get_metadata() you can pass that in as
+        metadata, so the files are not collected and read a second time.
+        """
+        if metadata is None:
+            metadata = self.get_metadata()
+        start = 0
+        for meta_list in _batched(metadata, batch_size):
+            gdf = self._metadata_to_geodataframe(meta_list)
+            gdf.index = pd.RangeIndex(start, start + len(gdf))
+            start += len(gdf)
+            yield gdf
+
+    @staticmethod
+    def _metadata_to_geodataframe(meta_list: Iterable[Metadata]) -> gpd.GeoDataFrame:
+        # One pass over the metadata for both the columns and the geometries.
+        columns, geoms = Metadata.to_columns_and_polygons(meta_list)
+        if not columns:
+            return gpd.GeoDataFrame()
+
+        epsg = columns["proj_epsg"][0]
+        columns["proj_geometry_as_wkt"] = list(shapely.to_wkt(geoms))
+        columns = _convert_columns_to_string(columns)
+
+        crs = get_crs(epsg) if epsg is not None else None
+        return gpd.GeoDataFrame(columns, crs=crs, geometry=geoms)
 
     def get_metadata_as_dataframe(self) -> pd.DataFrame:
-        return pd.DataFrame.from_records(md.to_dict() for md in self.get_metadata())
+        return pd.DataFrame(_records_to_columns(md.to_dict() for md in self.get_metadata()))
 
     def get_stac_items_as_geodataframe(self) -> gpd.GeoDataFrame:
-        item_list = list(self.get_stac_items())
-        if not item_list:
-            raise InvalidOperation("There are no STAC items. Can not create a GeoDataFrame")
-
-        epsg = item_list[0].properties.get("proj:epsg", 4326)
-        records = self.convert_fields_to_string(i.to_dict() for i in item_list)
-        shapes = [shape(item.geometry) for item in item_list]
-        return gpd.GeoDataFrame(records, crs=epsg, geometry=shapes)
+        return _stac_items_to_geodataframe(self.get_stac_items())
 
     def get_stac_items_as_dataframe(self) -> pd.DataFrame:
-        return pd.DataFrame.from_records(md.to_dict() for md in self.get_stac_items())
+        return pd.DataFrame(_records_to_columns(md.to_dict() for md in self.get_stac_items()))
 
 
 # ##############################################################################
@@ -1083,6 +1739,34 @@ class GeoTiffPipeline:
 # TODO: move the command functions to separate module, perhaps "cli.py"
 
 
+def _to_absolute_path(path: Union[Path, str]) -> Path:
+    """Same as Path(path).expanduser().absolute(), so symlinks are not resolved.
+
+    Absolute paths are returned as they are, without looking up the home or
+    current directory.
+    """
+    path = Path(path)
+    if path.is_absolute():
+        return path
+    return path.expanduser().absolute()
+
+
+@functools.lru_cache(maxsize=8)
+def _load_collection_config_cached(path: str, mtime_ns: int, size: int) -> CollectionConfig:
+    return CollectionConfig.from_json_file(path)
+
+
+def _load_collection_config(collection_config_path: Path) -> CollectionConfig:
+    """Load a CollectionConfig from a JSON file.
+
+    The result is cached until the file changes, so callers share the same
+    object and should not modify it.
+    """
+    path = _to_absolute_path(collection_config_path)
+    stat = path.stat()
+    return _load_collection_config_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+
 def _setup_builder(
     input_dir: Path,
     glob: str,
@@ -1090,15 +1774,19 @@ def _setup_builder(
     overwrite: Optional[bool] = False,
     collection_config_path: Optional[Path] = None,
     max_files_to_process: Optional[int] = -1,
+    max_workers: Optional[int] = None,
+    use_processes: bool = False,
+    scan_workers: int = 1,
 ) -> STACBuilder:
     """Build a STAC collection from a directory of geotiff files."""
 
     builder = STACBuilder()
+    builder.max_workers = max_workers
+    builder.use_processes = use_processes
+    builder.scan_workers = scan_workers
 
     if collection_config_path:
-        conf_contents = collection_config_path.read_text()
-        config = CollectionConfig(**json.loads(conf_contents))
-        builder.collection_config = config
+        builder.collection_config = _load_collection_config(collection_config_path)
 
     builder.glob = glob
     builder.input_dir = input_dir
@@ -1117,15 +1805,26 @@ def command_build_collection(
     output_dir: Path,
     overwrite: bool,
     max_files: Optional[int] = -1,
+    max_workers: Optional[int] = None,
+    use_processes: bool = False,
+    scan_workers: int = 1,
 ):
-    """Build a STAC collection from a directory of geotiff files."""
+    """Build a STAC collection from a directory of geotiff files.
+
+    max_workers is the number of workers that read the metadata of the files, None uses the default.
+    With use_processes=True those workers are processes instead of threads.
+    scan_workers is the number of threads that list the input directories.
+    """
     builder: STACBuilder = _setup_builder(
-        collection_config_path=Path(collection_config_path).expanduser().absolute(),
+        collection_config_path=_to_absolute_path(collection_config_path),
         glob=glob,
-        input_dir=Path(input_dir).expanduser().absolute(),
-        output_dir=Path(output_dir).expanduser().absolute(),
+        input_dir=_to_absolute_path(input_dir),
+        output_dir=_to_absolute_path(output_dir),
         overwrite=overwrite,
         max_files_to_process=max_files,
+        max_workers=max_workers,
+        use_processes=use_processes,
+        scan_workers=scan_workers,
     )
     builder.build_collection()
 
@@ -1133,15 +1832,16 @@ def command_build_collection(
 def command_list_input_files(
     glob: str,
     input_dir: Path,
+    scan_workers: int = 1,
 ):
     """Build a STAC collection from a directory of geotiff files."""
-    builder = STACBuilder()
-    builder.glob = glob
-    builder.input_dir = Path(input_dir).expanduser().absolute()
-
-    builder.collect_input_files()
+    file_collector = FileCollector()
+    file_collector.setup(
+        FileCollectorConfig(input_dir=_to_absolute_path(input_dir), glob=glob, max_workers=scan_workers)
+    )
 
-    for f in builder.input_files:
+    # We only print the paths, so we don't need Path objects.
+    for f in file_collector.iter_file_paths():
         print(f)
 
 
@@ -1151,13 +1851,14 @@ def command_list_metadata(
     input_dir: Path,
     max_files: Optional[int] = -1,
     as_dataframe: bool = False,
+    save_shapefile: bool = False,
 ):
     """Build a STAC collection from a directory of geotiff files."""
 
     builder: STACBuilder = _setup_builder(
-        collection_config_path=Path(collection_config_path).expanduser().absolute(),
+        collection_config_path=_to_absolute_path(collection_config_path),
         glob=glob,
-        input_dir=Path(input_dir).expanduser().absolute(),
+        input_dir=_to_absolute_path(input_dir),
         output_dir=Path("/tmp"),
         overwrite=True,
         max_files_to_process=max_files,
@@ -1169,10 +1870,7 @@ def command_list_metadata(
     if as_dataframe:
         df: gpd.GeoDataFrame = builder.metadata_as_geodataframe()
         print(df.to_string())
-        out_dir = Path("metadata_table")
-        df.to_csv(out_dir / "metadata_table.csv", sep="|")
-        df.to_file(out_dir / "shp/metadata_table.shp")
-        df.to_parquet(out_dir / "metadata_table.parquet")
+        _save_geodataframe(df, Path("metadata_table"), "metadata_table", save_shapefile=save_shapefile)
     else:
         metadata: Metadata
         for metadata in builder.try_parse_metadata():
@@ -1190,9 +1888,9 @@ def command_list_stac_items(
     """Build a STAC collection from a directory of geotiff files."""
 
     builder: STACBuilder = _setup_builder(
-        collection_config_path=Path(collection_config_path).expanduser().absolute(),
+        collection_config_path=_to_absolute_path(collection_config_path),
         glob=glob,
-        input_dir=Path(input_dir).expanduser().absolute(),
+        input_dir=_to_absolute_path(input_dir),
         output_dir=Path("/tmp"),
         overwrite=True,
         max_files_to_process=max_files,
@@ -1204,43 +1902,28 @@ def command_list_stac_items(
         # print(df.to_string())
         df.to_csv("stac_items_table.csv", sep="|")
     else:
-        min_west = None
-        max_east = None
-        min_south = None
-        max_north = None
-
-        items_bbox = {
-            "min_west": None,
-            "max_east": None,
-            "min_south": None,
-            "max_north": None,
-        }
-
+        item_ids = []
+        bboxes = []
         for item in builder.try_parse_items():
             pprint.pprint(item.to_dict())
             print()
-            west, south, east, north = item.bbox
-            if min_west is None:
-                min_west = west
-                max_east = east
-                min_south = south
-                max_north = north
-            else:
-                if west < min_west:
-                    items_bbox["min_west"] = item.id
-                    min_west = west
-                if south < min_south:
-                    items_bbox["min_south"] = item.id
-                    min_south = south
-                if east < max_east:
-                    items_bbox["max_east"] = item.id
-                    max_east = east
-                if north < max_north:
-                    items_bbox["max_north"] = item.id
-                    max_north = north
+            item_ids.append(item.id)
+            bboxes.append(item.bbox)
+
+        if not bboxes:
+            return
+
+        bbox, indices = _get_bbox_extremes(bboxes)
+        min_west, min_south, max_east, max_north = bbox
+        items_bbox = {
+            "min_west": item_ids[indices[0]],
+            "min_south": item_ids[indices[1]],
+            "max_east": item_ids[indices[2]],
+            "max_north": item_ids[indices[3]],
+        }
 
         print(f"Collection BBox: [{min_west=}, {min_south=}, {max_east=}, {max_north=}]")
-        print(f"{items_bbox}=]")
+        print(f"{items_bbox=}")
 
 
 def command_load_collection(
@@ -1270,10 +1953,7 @@ def command_post_process_collection(
     regenerate the entire set every time.
     """
     builder = STACBuilder()
-    collection_config_path = Path(collection_config_path)
-    conf_contents = collection_config_path.read_text()
-    config = CollectionConfig(**json.loads(conf_contents))
-    builder.collection_config = config
+    builder.collection_config = _load_collection_config(collection_config_path)
 
     out_dir = Path(output_dir) if output_dir else None
     builder.post_process_collection(Path(collection_file), out_dir)
@@ -1292,24 +1972,55 @@ class CommandNewPipeline:
         input_dir: Path,
         max_files: Optional[int] = -1,
         save_dataframe: bool = True,
+        save_shapefile: bool = False,
+        use_cache: bool = False,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        scan_workers: int = 1,
     ):
-        """Build a STAC collection from a directory of geotiff files."""
+        """Build a STAC collection from a directory of geotiff files.
 
-        collection_config_path = Path(collection_config_path).expanduser().absolute()
-        coll_cfg = CollectionConfig.from_json_file(collection_config_path)
+        With use_cache=True the metadata is kept in a MetadataCache in the
+        user's cache directory, so the next run only reads files that changed.
+        max_workers is the number of workers that read the metadata of the files, None uses the default.
+        With use_processes=True those workers are processes instead of threads.
+        scan_workers is the number of threads that list the input directories.
+        """
 
-        file_coll_cfg = FileCollectorConfig(input_dir=input_dir, glob=glob, max_files=max_files)
+        coll_cfg = _load_collection_config(collection_config_path)
 
-        pipeline = GeoTiffPipeline.from_config(collection_config=coll_cfg, file_coll_cfg=file_coll_cfg)
+        # The paths of the files become the hrefs in the metadata and the cache, so they must not
+        # depend on the working directory.
+        file_coll_cfg = FileCollectorConfig(
+            input_dir=_to_absolute_path(input_dir), glob=glob, max_files=max_files, max_workers=scan_workers
+        )
 
-        for meta in pipeline.get_metadata():
-            pprint.pprint(meta.to_dict(include_internal=True))
-            print()
+        # The metadata depends on how the paths are parsed, so a different parser must not reuse the cache.
+        metadata_cache = MetadataCache(settings=coll_cfg.input_path_parser) if use_cache else None
+        pipeline = GeoTiffPipeline.from_config(
+            collection_config=coll_cfg,
+            file_coll_cfg=file_coll_cfg,
+            metadata_cache=metadata_cache,
+            max_workers=max_workers,
+            use_processes=use_processes,
+        )
 
-        if save_dataframe:
-            df = pipeline.get_metadata_as_geodataframe()
-            out_dir = Path("tmp/visualization") / coll_cfg.collection_id
-            _save_geodataframe(df, out_dir, "metadata_table")
+        def print_metadata(metadata: Iterable[Metadata]) -> Iterable[Metadata]:
+            for meta in metadata:
+                pprint.pprint(meta.to_dict(include_internal=True))
+                print()
+                yield meta
+
+        # Print the metadata while we save it, so we only collect and read the files once.
+        metadata = print_metadata(pipeline.get_metadata())
+        if not save_dataframe:
+            for _ in metadata:
+                pass
+            return
+
+        # Save it in batches so we never need the metadata of all files in memory.
+        out_dir = Path("tmp/visualization") / coll_cfg.collection_id
+        _save_metadata_batches(metadata, out_dir, "metadata_table", save_shapefile=save_shapefile)
 
     @staticmethod
     def command_list_stac_items(
@@ -1318,42 +2029,197 @@ class CommandNewPipeline:
         input_dir: Path,
         max_files: Optional[int] = -1,
         save_dataframe: bool = True,
+        save_shapefile: bool = False,
+        use_cache: bool = False,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        scan_workers: int = 1,
     ):
-        """Build a STAC collection from a directory of geotiff files."""
+        """Build a STAC collection from a directory of geotiff files.
 
-        collection_config_path = Path(collection_config_path).expanduser().absolute()
-        coll_cfg = CollectionConfig.from_json_file(collection_config_path)
+        With use_cache=True the metadata is kept in a MetadataCache, the same as in command_list_metadata.
+        max_workers is the number of workers that read the metadata of the files, None uses the default.
+        With use_processes=True those workers are processes instead of threads.
+        scan_workers is the number of threads that list the input directories.
+        """
 
-        file_coll_cfg = FileCollectorConfig(input_dir=input_dir, glob=glob, max_files=max_files)
+        coll_cfg = _load_collection_config(collection_config_path)
 
-        pipeline = GeoTiffPipeline.from_config(collection_config=coll_cfg, file_coll_cfg=file_coll_cfg)
+        # The paths of the files become the hrefs in the metadata and the cache, so they must not
+        # depend on the working directory.
+        file_coll_cfg = FileCollectorConfig(
+            input_dir=_to_absolute_path(input_dir), glob=glob, max_files=max_files, max_workers=scan_workers
+        )
 
-        for item in pipeline.get_stac_items():
-            pprint.pprint(item.to_dict())
+        metadata_cache = MetadataCache(settings=coll_cfg.input_path_parser) if use_cache else None
+        pipeline = GeoTiffPipeline.from_config(
+            collection_config=coll_cfg,
+            file_coll_cfg=file_coll_cfg,
+            metadata_cache=metadata_cache,
+            max_workers=max_workers,
+            use_processes=use_processes,
+        )
 
-        if save_dataframe:
-            df = pipeline.get_stac_items_as_geodataframe()
+        failed_files = []
+
+        def print_items() -> Iterable[Dict[str, Any]]:
+            for file, item in pipeline.iter_stac_items_with_source():
+                if item is None:
+                    failed_files.append(file)
+                    continue
+                item_dict = item.to_dict()
+                pprint.pprint(item_dict)
+                yield item_dict
+
+        # Print the items while they go into the dataframe, so we only collect and process the files once,
+        # and we don't keep a list of all items next to the columns of the dataframe.
+        item_dicts = print_items()
+        df = None
+        try:
+            if save_dataframe:
+                df = _stac_item_dicts_to_geodataframe(item_dicts)
+            else:
+                for _ in item_dicts:
+                    pass
+        finally:
+            # Also when there were no items at all, for the dataframe.
+            if failed_files:
+                print(f"WARNING: Could not create a STAC item for {len(failed_files)} files:")
+                for file in failed_files:
+                    print(f"    {file}")
+
+        if df is not None:
             out_dir = Path("tmp/visualization") / coll_cfg.collection_id
-            _save_geodataframe(df, out_dir, "stac_items")
+            _save_geodataframe(df, out_dir, "stac_items", save_shapefile=save_shapefile)
+
 
+def _save_geodataframe(gdf: gpd.GeoDataFrame, out_dir: Path, table_name: str, save_shapefile: bool = False) -> None:
+    """Save the GeoDataFrame as CSV and GeoParquet, and optionally as a shapefile.
 
-def _save_geodataframe(gdf: gpd.GeoDataFrame, out_dir: Path, table_name: str) -> None:
-    shp_dir = out_dir / "shp"
-    if not shp_dir.exists():
-        shp_dir.mkdir(parents=True)
+    Writing a shapefile is by far the slowest, so it is off by default.
+    """
+    if not out_dir.exists():
+        out_dir.mkdir(parents=True)
 
     csv_path = out_dir / f"{table_name}.csv"
     shapefile_path = out_dir / f"shp/{table_name}.shp"
     parquet_path = out_dir / f"{table_name}.parquet"
 
     print(f"Saving pipe-separated CSV file to: {csv_path}")
-    gdf.to_csv(csv_path, sep="|")
+    gdf.to_csv(csv_path, sep="|", chunksize=CSV_CHUNK_SIZE)
 
-    print(f"Saving shapefile to: {shapefile_path }")
-    gdf.to_file(shapefile_path)
+    if save_shapefile:
+        print(f"Saving shapefile to: {shapefile_path }")
+        shapefile_path.parent.mkdir(exist_ok=True)
+        gdf.to_file(shapefile_path)
 
     print(f"Saving geoparquet to: {parquet_path}")
-    gdf.to_parquet(parquet_path)
+    gdf.to_parquet(parquet_path, compression=PARQUET_COMPRESSION, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+
+def _save_metadata_batches(
+    metadata: Iterable[Metadata],
+    out_dir: Path,
+    table_name: str,
+    save_shapefile: bool = False,
+    batch_size: int = 50_000,
+) -> None:
+    """Save the same files as _save_geodataframe for the metadata, but append the data one batch at a time.
+
+    The GeoParquet file is written straight from Arrow, with the schema of Metadata.arrow_schema,
+    so every batch has the same column types.
+    """
+    if not out_dir.exists():
+        out_dir.mkdir(parents=True)
+
+    csv_path = out_dir / f"{table_name}.csv"
+    shapefile_path = out_dir / f"shp/{table_name}.shp"
+    parquet_path = out_dir / f"{table_name}.parquet"
+
+    print(f"Saving pipe-separated CSV file to: {csv_path}")
+    print(f"Saving geoparquet to: {parquet_path}")
+    if save_shapefile:
+        print(f"Saving shapefile to: {shapefile_path}")
+        shapefile_path.parent.mkdir(exist_ok=True)
+
+    start = 0
+    shapefile_columns = None
+    with _GeoParquetWriter(parquet_path, Metadata.arrow_schema()) as parquet_writer:
+        for meta_list in _batched(metadata, batch_size):
+            parquet_writer.write_table(Metadata.to_arrow_batch(meta_list), crs=meta_list[0].proj_epsg)
+
+            gdf = GeoTiffPipeline._metadata_to_geodataframe(meta_list)
+            # The index continues from one batch to the next.
+            gdf.index = pd.RangeIndex(start, start + len(gdf))
+            is_first = start == 0
+            start += len(gdf)
+            gdf.to_csv(csv_path, sep="|", mode="w" if is_first else "a", header=is_first, chunksize=CSV_CHUNK_SIZE)
+
+            if not save_shapefile:
+                continue
+            if is_first:
+                gdf.to_file(shapefile_path)
+                # A shapefile truncates the column names, so the next batches must use the names it chose.
+                shapefile_columns = gpd.read_file(shapefile_path, rows=0).columns.drop("geometry")
+            else:
+                columns = gdf.columns.drop(gdf.geometry.name)
+                gdf = gdf.rename(columns=dict(zip(columns, shapefile_columns)))
+                gdf.to_file(shapefile_path, mode="a")
+
+
+class _GeoParquetWriter:
+    """Writes Arrow tables to a single GeoParquet file, one at a time.
+
+    gpd.GeoDataFrame.to_parquet can not append to a file, so this adds the
+    GeoParquet metadata itself. All tables must have the given schema.
+    The CRS of the first table is used for the whole file.
+    """
+
+    def __init__(self, path: Path, schema: pa.Schema, geometry_column: str = "geometry") -> None:
+        self.path = path
+        self.schema = schema
+        self.geometry_column = geometry_column
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def __enter__(self) -> "_GeoParquetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def write_table(self, table: Union[pa.Table, pa.RecordBatch], crs: Any = None) -> None:
+        """Write an Arrow table or record batch, where the geometry column contains WKB."""
+        if isinstance(table, pa.RecordBatch):
+            table = pa.Table.from_batches([table])
+
+        if self._writer is None:
+            schema = self._create_schema(self.schema, crs, self.geometry_column)
+            self._writer = pq.ParquetWriter(self.path, schema, compression=PARQUET_COMPRESSION)
+        # The writer raises an error when the table does not have the schema, we don't try to convert it.
+        self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    @staticmethod
+    def _create_schema(schema: pa.Schema, crs: Any, geometry_column: str) -> pa.Schema:
+        geo_metadata = {
+            "version": "1.0.0",
+            "primary_column": geometry_column,
+            "columns": {
+                geometry_column: {
+                    "encoding": "WKB",
+                    # We don't know yet which types the later batches contain.
+                    "geometry_types": [],
+                    "crs": get_crs(crs).to_json_dict() if crs is not None else None,
+                }
+            },
+        }
+        metadata = dict(schema.metadata or {})
+        metadata[b"geo"] = json.dumps(geo_metadata).encode("utf8")
+        return schema.with_metadata(metadata)
 
 
 # Switch to the new commands, comment out to use the old commands again.
@@ -1,24 +1,134 @@
+import array
+import contextlib
 import datetime as dt
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+import json
+import logging
+import os
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Tuple, Union
 
 
+import numpy as np
+import pyarrow as pa
 import rasterio
+import shapely
 from shapely import to_wkt
-from shapely.geometry import box, mapping, Polygon
+from shapely.geometry import Polygon
 from stactools.core.io import ReadHrefModifier
 
-from openeo.util import rfc3339, normalize_crs
+from openeo.util import rfc3339
 
 
 from stacbuilder.pathparsers import InputPathParser
-from stacbuilder.projections import reproject_bounding_box
+from stacbuilder.projections import get_normalized_crs, reproject_bounding_box
+
+
+_logger = logging.getLogger(__name__)
 
 
 BoundingBoxList = List[Union[float, int]]
 
 
+REMOTE_HREF_PREFIXES = ("http://", "https://", "s3://", "gs://", "az://", "/vsicurl/", "/vsis3/", "/vsigs/", "/vsiaz/")
+
+
+REMOTE_GDAL_OPTIONS = {
+    # Read the header with the first request instead of fetching it in small pieces.
+    "GDAL_INGESTED_BYTES_AT_OPEN": 32768,
+    # Don't list the remote directory to look for sidecar files.
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.tiff",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+}
+"""GDAL settings so that opening a remote GeoTIFF only downloads its header, not the whole file."""
+
+
+LOCAL_GDAL_OPTIONS = {
+    # By default GDAL lists the whole directory on each open, to look for sidecar files.
+    # With "TRUE" it checks only for the sidecar files it needs, so a directory
+    # with many files isn't listed again for every file in it.
+    "GDAL_DISABLE_READDIR_ON_OPEN": "TRUE",
+}
+"""GDAL settings for opening a GeoTIFF on a local or mounted file system."""
+
+
+def _is_remote_href(href: str) -> bool:
+    return href.startswith(REMOTE_HREF_PREFIXES)
+
+
+def _get_stem(href: str) -> str:
+    """Same as Path(href).stem, without creating a Path for each file."""
+    name = os.path.basename(href.rstrip("/"))
+    index = name.rfind(".")
+    return name[:index] if 0 < index < len(name) - 1 else name
+
+
+def _get_gdal_env(options: Dict[str, Any]) -> ContextManager:
+    """Get a rasterio.Env with these GDAL options, unless the current one already has them.
+
+    Starting a rasterio.Env takes about as long as reading a GeoTIFF's header,
+    so when the caller already set one up, for example with enter_local_gdal_env,
+    we don't start a new one for each file.
+    """
+    if rasterio.env.hasenv():
+        current_options = rasterio.env.getenv()
+        if all(current_options.get(key) == value for key, value in options.items()):
+            return contextlib.nullcontext()
+    return rasterio.Env(**options)
+
+
+def enter_local_gdal_env() -> None:
+    """Start a rasterio.Env with LOCAL_GDAL_OPTIONS for the rest of this thread or process.
+
+    This is meant as the initializer for the workers of a thread or process pool.
+    There is no way to leave this env, it ends with the worker: rasterio and GDAL
+    keep these settings per thread, and a worker process takes them with it when
+    it exits. So only use it for a pool that is shut down when the work is done,
+    as _map_in_parallel in stacbuilder.builder does, and never in your main thread.
+    """
+    rasterio.Env(**LOCAL_GDAL_OPTIONS).__enter__()
+
+
+def _bbox_to_polygon_dict(bbox: BoundingBoxList) -> Dict[str, Any]:
+    """Convert a bbox to a GeoJSON polygon, the same as mapping(box(*bbox)) but without creating a shapely geometry."""
+    west, south, east, north = (float(c) for c in bbox[:4])
+    return {
+        "type": "Polygon",
+        "coordinates": (((east, south), (east, north), (west, north), (west, south), (east, south)),),
+    }
+
+
+def _to_string(value: Any) -> Any:
+    """Convert datetimes and lists to strings, the same way as when we save a DataFrame."""
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+
 class Metadata:
+    # We can have a Metadata for each of millions of files, and without a __dict__ each one takes less memory.
+    __slots__ = (
+        "href",
+        "bbox",
+        "proj_bbox",
+        "transform",
+        "shape",
+        "tags",
+        "_proj_epsg",
+        "_item_id",
+        "_item_type",
+        "_band",
+        "_datetime",
+        "_start_datetime",
+        "_end_datetime",
+        "_year",
+        "_month",
+        "_day",
+        "_extract_href_info",
+        "_info_from_href",
+    )
+
     def __init__(
         self,
         href: str,
@@ -29,42 +139,51 @@ class Metadata:
             modified_href = read_href_modifier(href)
         else:
             modified_href = href
-        with rasterio.open(modified_href) as dataset:
+        if _is_remote_href(str(modified_href)):
+            gdal_env = _get_gdal_env(REMOTE_GDAL_OPTIONS)
+        else:
+            gdal_env = _get_gdal_env(LOCAL_GDAL_OPTIONS)
+        with gdal_env, rasterio.open(modified_href) as dataset:
+            # Each of these properties asks GDAL again, so we only get them once.
+            crs = dataset.crs
+            transform = dataset.transform
             self.proj_bbox = list(dataset.bounds)
 
             self._proj_epsg = None
             # TODO: once this works well, integrate normalize_crs into  proj_epsg
-            normalized_epsg = normalize_crs(dataset.crs)
+            normalized_epsg = get_normalized_crs(crs)
             if normalized_epsg is not None:
                 self.proj_epsg = normalized_epsg
-            elif hasattr(dataset.crs, "to_epsg"):
-                self.proj_epsg = dataset.crs.to_epsg()
+            elif hasattr(crs, "to_epsg"):
+                self.proj_epsg = crs.to_epsg()
 
             if self.proj_epsg in [4326, "EPSG:4326", "epsg:4326"]:
                 self.bbox = self.proj_bbox
             else:
                 west, south, east, north = self.proj_bbox[:4]
-                self.bbox = reproject_bounding_box(west, south, east, north, from_crs=dataset.crs, to_crs="epsg:4326")
-            self.transform = list(dataset.transform)[0:6]
+                self.bbox = reproject_bounding_box(west, south, east, north, from_crs=crs, to_crs="epsg:4326")
+            self.transform = list(transform)[0:6]
             self.shape = dataset.shape
             self.tags = dataset.tags()
 
-            print(f"{href=}")
-            print(f"{modified_href=}")
-            print(f"projected: proj_bbox={self.proj_bbox}")
-            print(f"projected CRS: {dataset.crs}")
-            print(f"{dataset.bounds=}")
-            print(f"{dataset.transform=}")
-            print(f"lat long: bbox={self.bbox}")
-            # print(f"{dataset.shape=}")
-            # print(f"{dataset.tags()=}")
+            # This runs for every file, so don't even format the messages unless we need them.
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug(f"{href=}")
+                _logger.debug(f"{modified_href=}")
+                _logger.debug(f"projected: proj_bbox={self.proj_bbox}")
+                _logger.debug(f"projected CRS: {crs}")
+                _logger.debug(f"{dataset.bounds=}")
+                _logger.debug(f"{transform=}")
+                _logger.debug(f"lat long: bbox={self.bbox}")
+                # _logger.debug(f"{dataset.shape=}")
+                # _logger.debug(f"{dataset.tags()=}")
 
         self.href = href
-        self._item_id = Path(href).stem
+        self._item_id = _get_stem(href)
         self._item_type = None
         self._band = None
 
-        self._datetime = dt.datetime.utcnow()
+        self._datetime = None
         self._start_datetime = None
         self._end_datetime = None
         self._year = None
@@ -73,6 +192,25 @@ class Metadata:
 
         self._extract_href_info = extract_href_info
         self.process_href_info()
+        if self._datetime is None:
+            # Only when the path parser did not give us the datetime.
+            self._datetime = dt.datetime.utcnow()
+
+    def to_state(self) -> Dict[str, Any]:
+        """Get the attributes as a plain dict, for example to store them in a cache.
+
+        The path parser is left out, it is only needed to create the Metadata.
+        """
+        return {name: getattr(self, name) for name in self.__slots__ if name != "_extract_href_info"}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Metadata":
+        """Create a Metadata from the dict of to_state, without opening the file again."""
+        metadata = cls.__new__(cls)
+        metadata._extract_href_info = None
+        for name, value in state.items():
+            setattr(metadata, name, value)
+        return metadata
 
     def process_href_info(self):
         href_info = self._extract_href_info.parse(self.href)
@@ -102,8 +240,7 @@ class Metadata:
 
     @property
     def geometry(self) -> Dict[str, Any]:
-        geometry_dict: Dict[str, Any] = mapping(box(*self.bbox))
-        return geometry_dict
+        return _bbox_to_polygon_dict(self.bbox)
 
     @property
     def proj_epsg(self) -> Union[int, None]:
@@ -117,8 +254,7 @@ class Metadata:
 
     @property
     def proj_geometry(self) -> Dict[str, Any]:
-        geometry_dict: Dict[str, Any] = mapping(box(*self.proj_bbox))
-        return geometry_dict
+        return _bbox_to_polygon_dict(self.proj_bbox)
 
     @property
     def proj_geometry_as_wkt(self) -> str:
@@ -219,7 +355,103 @@ class Metadata:
             Include internal information for debugging, defaults to False.
         :return: A dictionary that represents the same metadata.
         """
-        data = {
+        data = self._get_fields()
+        data["proj_geometry_as_wkt"] = self.proj_geometry_as_wkt
+
+        # Include internal information for debugging.
+        if include_internal:
+            data["_info_from_href"] = self._info_from_href
+
+        return data
+
+    @classmethod
+    def to_columns(cls, meta_list: Iterable["Metadata"]) -> Dict[str, List[Any]]:
+        """Convert Metadata to the same fields as to_dict, but with one list of values per field.
+
+        This is what you need to build a DataFrame. The WKT for all geometries is
+        created in a single call to shapely, instead of one call per Metadata.
+        """
+        columns, polygons = cls.to_columns_and_polygons(meta_list)
+        if columns:
+            columns["proj_geometry_as_wkt"] = list(shapely.to_wkt(polygons))
+        return columns
+
+    @classmethod
+    def to_columns_and_polygons(cls, meta_list: Iterable["Metadata"]) -> Tuple[Dict[str, List[Any]], np.ndarray]:
+        """Same as to_columns, but return the proj_geometry as shapely Polygons instead of WKT.
+
+        This goes over the Metadata only once, so meta_list can also be a generator.
+        The polygons are the same as proj_geometry_shapely.
+        """
+        columns: Dict[str, List[Any]] = {}
+        # Flat array of the projected bounding boxes, 4 values per Metadata.
+        proj_bounds = array.array("d")
+        for metadata in meta_list:
+            for key, value in metadata._get_fields().items():
+                columns.setdefault(key, []).append(value)
+            proj_bounds.extend(metadata.proj_bbox[:4])
+
+        if not columns:
+            return {}, np.empty(0, dtype=object)
+
+        proj_bboxes = np.frombuffer(proj_bounds, dtype=np.float64).reshape(-1, 4)
+        return columns, shapely.box(*proj_bboxes.T, ccw=False)
+
+    @classmethod
+    def arrow_schema(cls) -> pa.Schema:
+        """The Arrow schema of the record batches from to_arrow_batch."""
+        polygon_type = pa.struct(
+            [
+                ("coordinates", pa.list_(pa.list_(pa.list_(pa.float64())))),
+                ("type", pa.string()),
+            ]
+        )
+        return pa.schema(
+            [
+                ("itemId", pa.string()),
+                ("href", pa.string()),
+                ("item_type", pa.string()),
+                ("band", pa.string()),
+                ("datetime", pa.string()),
+                ("start_datetime", pa.string()),
+                ("end_datetime", pa.string()),
+                ("year", pa.int64()),
+                ("month", pa.int64()),
+                ("day", pa.int64()),
+                ("bbox", pa.string()),
+                ("proj_epsg", pa.int64()),
+                ("proj_bbox", pa.string()),
+                ("geometry", pa.binary()),
+                ("proj_geometry", polygon_type),
+                ("proj_geometry_as_wkt", pa.string()),
+            ]
+        )
+
+    @classmethod
+    def to_arrow_batch(cls, meta_list: Iterable["Metadata"]) -> pa.RecordBatch:
+        """Convert Metadata to an Arrow RecordBatch, without going through pandas.
+
+        The columns are the same as in the GeoDataFrame of the metadata:
+        the datetimes and bounding boxes are strings, and the column "geometry"
+        is proj_geometry as WKB, so the batch can be written to GeoParquet.
+        """
+        columns, polygons = cls.to_columns_and_polygons(meta_list)
+        if columns:
+            columns["geometry"] = shapely.to_wkb(polygons)
+            columns["proj_geometry_as_wkt"] = shapely.to_wkt(polygons)
+
+        schema = cls.arrow_schema()
+        arrays = []
+        for field in schema:
+            values = columns.get(field.name, [])
+            if pa.types.is_string(field.type):
+                values = [_to_string(v) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _get_fields(self) -> Dict[str, Any]:
+        """Get the fields of to_dict, except proj_geometry_as_wkt and the internal ones."""
+        return {
             "itemId": self.item_id,
             "href": self.href,
             "item_type": self.item_type,
@@ -235,13 +467,7 @@ class Metadata:
             "proj_bbox": self.proj_bbox,
             "geometry": self.geometry,
             "proj_geometry": self.proj_geometry,
-            "proj_geometry_as_wkt": self.proj_geometry_as_wkt,
         }
-        # Include internal information for debugging.
-        if include_internal:
-            data["_info_from_href"] = self._info_from_href
-
-        return data
 
     def __str__(self):
         return str(self.to_dict())
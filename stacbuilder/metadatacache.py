@@ -0,0 +1,117 @@
+"""Persistent cache for the Metadata we extract from the input files.
+
+Extracting the metadata means opening every file, which is the slowest step
+when you rebuild a large collection over and over while you are fine-tuning
+its configuration. Files that did not change since the previous run don't
+need to be read again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shelve
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import pydantic
+
+from stacbuilder.metadata import Metadata
+
+
+_logger = logging.getLogger(__name__)
+
+
+CACHE_FORMAT_VERSION = 3
+"""Increase this when Metadata changes, so the old cache entries are no longer used."""
+
+
+def get_default_cache_file() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "stacbuilder" / "metadata"
+
+
+class MetadataCache:
+    """Stores Metadata on disk, keyed on the file's path, size and modification time.
+
+    Each entry is the plain dict of Metadata.to_state, so the cache does not
+    depend on the path parser or other classes that the Metadata refers to.
+
+    The key also contains a fingerprint of the settings that determine the
+    metadata, for example the InputPathParserConfig, so changing those
+    settings invalidates the cache. The settings must be a pydantic model or
+    data that can be converted to JSON.
+
+    The underlying shelve database is not thread-safe, only use it from one thread.
+    """
+
+    def __init__(self, cache_file: Optional[Union[Path, str]] = None, settings: Any = None) -> None:
+        self.cache_file = Path(cache_file) if cache_file else get_default_cache_file()
+        self._fingerprint = self.get_fingerprint(settings)
+        self._db: Optional[shelve.Shelf] = None
+
+    @staticmethod
+    def get_fingerprint(settings: Any) -> str:
+        if isinstance(settings, pydantic.BaseModel):
+            settings = settings.model_dump(mode="json")
+        data = json.dumps([CACHE_FORMAT_VERSION, settings], sort_keys=True)
+        return hashlib.sha256(data.encode("utf8")).hexdigest()
+
+    def __enter__(self) -> "MetadataCache":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def open(self) -> None:
+        if self._db is None:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self._db = shelve.open(str(self.cache_file))
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get_key(self, file: Union[Path, str]) -> Optional[str]:
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return None
+        return f"{os.path.abspath(file)}:{stat.st_mtime_ns}:{stat.st_size}:{self._fingerprint}"
+
+    def get(self, file: Union[Path, str], key: Optional[str] = None) -> Optional[Metadata]:
+        """Get the cached Metadata for file, or None when it is not in the cache.
+
+        If you already have the key from get_key you can pass it in, to save a stat call.
+        """
+        if key is None:
+            key = self.get_key(file)
+        if key is None:
+            return None
+
+        self.open()
+        try:
+            state = self._db.get(key)
+        except (pickle.UnpicklingError, AttributeError, EOFError, ImportError) as exc:
+            # An entry written by an older version of stacbuilder, treat it as a miss.
+            _logger.warning(f"Ignoring unreadable cache entry for {file}: {exc!r}")
+            return None
+        if state is None:
+            return None
+        if state["href"] != str(file):
+            # The key uses the absolute path, but the href is the path as it was given, for example
+            # relative to another working directory. Reading the file again gives the right href.
+            return None
+        return Metadata.from_state(state)
+
+    def set(self, file: Union[Path, str], metadata: Metadata, key: Optional[str] = None) -> None:
+        if key is None:
+            key = self.get_key(file)
+        if key is None:
+            return
+
+        self.open()
+        self._db[key] = metadata.to_state()
@@ -6,7 +6,10 @@
 import abc
 import calendar
 import datetime as dt
+import logging
+import pprint
 import re
+import threading
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Union
 
@@ -14,6 +17,9 @@ from typing import Any, Callable, Dict, List, Optional, Union
 from stacbuilder.config import InputPathParserConfig
 
 
+_logger = logging.getLogger(__name__)
+
+
 class UnknownInputPathParserClass(Exception):
     def __init__(self, classname: str, *args: object) -> None:
         message = f"There is no implementing class for this class name: {classname}"
@@ -77,8 +83,35 @@ class RegexInputPathParser(InputPathParser):
         self._type_converters = type_converters or {}
         self._fixed_values = fixed_values or {}
 
-        self._data = None
-        self._path = None
+        # The metadata is read by several threads that share one parser, so each
+        # thread needs its own copy of the file that it is parsing.
+        self._local = threading.local()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # A threading.local can not be pickled, which the process pool needs.
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def _data(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._local, "data", None)
+
+    @_data.setter
+    def _data(self, value: Optional[Dict[str, Any]]) -> None:
+        self._local.data = value
+
+    @property
+    def _path(self) -> Optional[str]:
+        return getattr(self._local, "path", None)
+
+    @_path.setter
+    def _path(self, value: Optional[str]) -> None:
+        self._local.path = value
 
     def parse(self, input_file: Union[Path, str]) -> Dict[str, Any]:
         data = {}
@@ -99,11 +132,8 @@ class RegexInputPathParser(InputPathParser):
         self._data = data
         self._post_process_data()
 
-        import pprint
-
-        print(f"{input_file=}")
-        pprint.pprint(self._data)
-        print()
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug(f"{input_file=}\n{pprint.pformat(self._data)}")
 
         return self._data
 
@@ -172,7 +202,7 @@ class PeopleEAIncaCFactorInputPathParser(RegexInputPathParser):
         year = self._data.get("year")
         month = self._data.get("month")
         day = self._data.get("day")
-        print(f"DEBUG: {year=}, {month=}, {day=}, {self._data=}, {self._path=}")
+        _logger.debug(f"{year=}, {month=}, {day=}, {self._data=}, {self._path=}")
 
         if not (year and month and day):
             print(
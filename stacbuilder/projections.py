@@ -1,6 +1,61 @@
-from typing import List
+import functools
+import threading
+from typing import Any, List, Union
 
 import pyproj
+from openeo.util import normalize_crs
+
+
+_thread_local = threading.local()
+
+
+@functools.lru_cache(maxsize=64)
+def get_crs(crs: Any) -> pyproj.CRS:
+    """Get the pyproj CRS for an EPSG code or any other input that pyproj.CRS.from_user_input accepts.
+
+    Creating a CRS is slow compared to what we do with it, and most collections
+    only use a handful of different CRSs, so we keep the CRS objects in a cache.
+    """
+    return pyproj.CRS.from_user_input(crs)
+
+
+def get_normalized_crs(crs: Any) -> Union[None, int, str]:
+    """Same as openeo.util.normalize_crs, but cached.
+
+    normalize_crs creates a new pyproj CRS each time, which takes much longer
+    than reading the rest of a GeoTIFF's header. CRS objects that have a
+    to_wkt method, such as rasterio's, are cached on their WKT.
+    """
+    if hasattr(crs, "to_wkt"):
+        crs = crs.to_wkt()
+    try:
+        return _normalize_crs_cached(crs)
+    except TypeError:
+        # Not hashable, for example a dict.
+        return normalize_crs(crs)
+
+
+@functools.lru_cache(maxsize=64)
+def _normalize_crs_cached(crs: Union[None, int, str]) -> Union[None, int, str]:
+    return normalize_crs(crs)
+
+
+def get_transformer(from_crs: Any, to_crs: Any) -> pyproj.Transformer:
+    """Get a transformer from from_crs to to_crs, using (x, y) axis order.
+
+    Transformers are cached because creating them is expensive.
+    pyproj Transformers are not thread-safe, so each thread gets its own cache.
+    """
+    transformers = getattr(_thread_local, "transformers", None)
+    if transformers is None:
+        transformers = _thread_local.transformers = {}
+
+    key = (from_crs, to_crs)
+    transformer = transformers.get(key)
+    if transformer is None:
+        transformer = pyproj.Transformer.from_crs(crs_from=from_crs, crs_to=to_crs, always_xy=True)
+        transformers[key] = transformer
+    return transformer
 
 
 def reproject_bounding_box(
@@ -24,8 +79,7 @@ def reproject_bounding_box(
             [min_x, min_y, max_x, max_y]
             [left, bottom, top, right]
     """
-    transformer = pyproj.Transformer.from_crs(crs_from=from_crs, crs_to=to_crs, always_xy=True)
-    transform = transformer.transform
+    transform = get_transformer(from_crs, to_crs).transform
 
     # ==========================================================================
     # CAVEAT
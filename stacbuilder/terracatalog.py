@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Tuple, Union, Optional
 
 import pandas as pd
 import pystac
+from pystac.extensions.item_assets import AssetDefinition
 
 import terracatalogueclient as tcc
 
@@ -14,9 +15,11 @@ from terracatalogueclient.config import CatalogueConfig
 from terracatalogueclient.config import CatalogueEnvironment
 
 
-def show_collections(catalogue: tcc.Catalogue):
+def show_collections(catalogue: tcc.Catalogue, collections: Optional[List[tcc.Collection]] = None):
     # make sure to retrieve config for the HRVPP catalogue
-    collections = list(catalogue.get_collections())
+    # Listing the collections is a request to the catalogue, pass them in if you already have them.
+    if collections is None:
+        collections = list(catalogue.get_collections())
     for c in collections:
         print(f"{c.id} - {c.properties['title']}")
 
@@ -78,8 +81,11 @@ def _get_columnNames(properties: Dict[str, Any]) -> List[str]:
     return cols
 
 
-def create_stac_collections(catalogue: tcc.Catalogue) -> List[pystac.Collection]:
-    collections = list(catalogue.get_collections())
+def create_stac_collections(
+    catalogue: tcc.Catalogue, collections: Optional[List[tcc.Collection]] = None
+) -> List[pystac.Collection]:
+    if collections is None:
+        collections = list(catalogue.get_collections())
     return [create_stac_collection(c) for c in collections]
 
 
@@ -201,8 +207,6 @@ def create_stac_item(product: tcc.Product) -> pystac.Item:
         properties={},
     )
 
-    from pystac.extensions.item_assets import AssetDefinition
-
     asset_def = AssetDefinition(
         properties={
             "type": pystac.MediaType.GEOTIFF,
@@ -240,12 +244,14 @@ def main():
     config = CatalogueConfig.from_environment(CatalogueEnvironment.HRVPP)
     catalogue = tcc.Catalogue(config)
 
-    for stac_coll in create_stac_collections(catalogue):
+    # Get the list of collections from the catalogue only once.
+    collections = list(catalogue.get_collections())
+
+    for stac_coll in create_stac_collections(catalogue, collections):
         pprint(stac_coll.to_dict())
 
-    show_collections(catalogue)
+    show_collections(catalogue, collections)
 
-    collections = list(catalogue.get_collections())
     coll = collections[0]
     pprint(dir(coll))
 
@@ -2,8 +2,11 @@ import copy
 import datetime as dt
 import json
 import logging
+import os
+import re
 import shutil
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Iterable
 
@@ -14,7 +17,22 @@ from openeo.util import rfc3339
 _logger = logging.getLogger(__name__)
 
 
+# Matches the time part of a datetime string in JSON that ends in "Z", up to the closing double quote.
+_UTC_Z_REGEX = re.compile(rb'(\d{2}:\d{2}:\d{2}(?:\.\d+)?)Z"')
+
+
 class TimezoneFormatConverter:
+    def __init__(self, max_workers: Optional[int] = None, use_fast_path: bool = True) -> None:
+        # Converting the items is I/O-bound: reading and writing many small JSON files.
+        # A thread pool lets the file operations of different items overlap.
+        self.max_workers: int = max_workers or min(32, (os.cpu_count() or 1) * 4)
+
+        # The fast path replaces the "Z" with a regex on the raw bytes of the item file,
+        # instead of parsing the JSON, converting the datetime properties and writing it back.
+        # Beware that it converts every datetime in the file, not only datetime,
+        # start_datetime and end_datetime.
+        self.use_fast_path: bool = use_fast_path
+
     def convert_collection(self, in_path: Path, out_path: Path) -> None:
         with open(in_path, "r") as f_in:
             data = json.load(f_in)
@@ -26,6 +44,11 @@ class TimezoneFormatConverter:
 
     def convert_item(self, in_path: Path, out_path: Path) -> None:
         _logger.debug(f"Converting STAC item from {in_path} to {out_path} ...")
+        if self.use_fast_path:
+            self._convert_item_bytes(in_path, out_path)
+            _logger.debug(f"DONE: converted STAC item from {in_path} to {out_path}")
+            return
+
         with open(in_path, "r") as f_in:
             data = json.load(f_in)
 
@@ -35,6 +58,16 @@ class TimezoneFormatConverter:
             json.dump(data, f_out, indent=2)
         _logger.debug(f"DONE: converted STAC item from {in_path} to {out_path}")
 
+    def _convert_item_bytes(self, in_path: Path, out_path: Path) -> None:
+        in_path = Path(in_path)
+        out_path = Path(out_path)
+        raw_data = in_path.read_bytes()
+        converted, num_replaced = _UTC_Z_REGEX.subn(rb'\1+00:00"', raw_data)
+
+        # Nothing to write when converting in place and nothing changed.
+        if num_replaced or in_path != out_path:
+            out_path.write_bytes(converted)
+
     def _convert_collection_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
         converted = copy.deepcopy(data)
         temporal_extent = converted["extent"]["temporal"]["interval"]
@@ -172,12 +205,13 @@ class TimezoneFormatConverter:
         out_collection_path = output_dir / in_coll_path.name
         self.convert_collection(in_coll_path, out_collection_path)
 
+        item_paths_out = [output_dir / item_path.relative_to(in_coll_path.parent) for item_path in in_item_paths]
         num_files = len(in_item_paths)
-        for i, item_path in enumerate(in_item_paths):
-            rel_path = item_path.relative_to(in_coll_path.parent)
-            out_path = output_dir / rel_path
-            print(f"PROGRESS: converting STAC item {i+1} of {num_files}:\n{item_path}\nto:\n{out_path}")
-            self.convert_item(item_path, out_path)
+        print(f"Converting {num_files} STAC items, using {self.max_workers} threads ...")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Consume the results so exceptions from the worker threads are raised here.
+            list(executor.map(self.convert_item, in_item_paths, item_paths_out))
+        print(f"DONE: converted {num_files} STAC items")
 
     # def _process_item_files(self, collection_dir: Path, converted_dir: Path, glob_pattern: str) -> None:
     #     """Convert each STAC item file found in the subfolders per year"""
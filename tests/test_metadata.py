@@ -0,0 +1,95 @@
+import contextlib
+from pathlib import Path
+from typing import List
+
+import pytest
+import rasterio
+import shapely
+from shapely.geometry import box, mapping
+
+from stacbuilder.builder import GeoTiffToMetaData
+from stacbuilder.metadata import LOCAL_GDAL_OPTIONS, REMOTE_GDAL_OPTIONS, Metadata, _get_gdal_env, _get_stem
+from stacbuilder.pathparsers import RegexInputPathParser
+
+
+@pytest.fixture
+def path_parser() -> RegexInputPathParser:
+    return RegexInputPathParser(r".*_(?P<band>[a-zA-Z0-9\-]+)_(?P<datetime>\d{4}-\d{2}-\d{2})\.tif$")
+
+
+@pytest.fixture
+def meta_list(data_dir, path_parser) -> List[Metadata]:
+    tiff_paths = sorted((data_dir / "geotiff/mock-geotiffs").glob("*/*.tif"))
+    return [GeoTiffToMetaData(path_parser).process(path) for path in tiff_paths]
+
+
+def test_geometry_is_same_as_shapely_mapping(data_dir, path_parser):
+    tiff_path = data_dir / "geotiff/mock-geotiffs/2000/observations_2m-temp-monthly_2000-01-01.tif"
+    metadata = GeoTiffToMetaData(path_parser).process(tiff_path)
+
+    assert metadata.geometry == mapping(box(*metadata.bbox))
+    assert metadata.proj_geometry == mapping(box(*metadata.proj_bbox))
+
+
+def test_to_columns_matches_to_dict(meta_list):
+    columns = Metadata.to_columns(meta_list)
+
+    records = [m.to_dict() for m in meta_list]
+    assert list(columns.keys()) == list(records[0].keys())
+    for key, values in columns.items():
+        assert values == [rec[key] for rec in records]
+
+
+def test_to_columns_empty_list():
+    assert Metadata.to_columns([]) == {}
+
+
+def test_to_columns_and_polygons_from_generator(meta_list):
+    columns, polygons = Metadata.to_columns_and_polygons(m for m in meta_list)
+
+    assert columns["itemId"] == [m.item_id for m in meta_list]
+    assert [p.equals_exact(m.proj_geometry_shapely, 0) for p, m in zip(polygons, meta_list)] == [True] * len(meta_list)
+
+
+def test_to_arrow_batch(meta_list):
+    batch = Metadata.to_arrow_batch(meta_list)
+
+    assert batch.schema == Metadata.arrow_schema()
+    assert batch.column("href").to_pylist() == [m.href for m in meta_list]
+    assert batch.column("datetime").to_pylist() == [m.datetime.isoformat() for m in meta_list]
+    assert shapely.from_wkb(batch.column("geometry").to_pylist())[0].equals(meta_list[0].proj_geometry_shapely)
+
+
+def test_to_arrow_batch_empty_list():
+    batch = Metadata.to_arrow_batch([])
+
+    assert batch.num_rows == 0
+    assert batch.schema == Metadata.arrow_schema()
+
+
+def test_metadata_has_no_instance_dict(data_dir, path_parser):
+    tiff_path = data_dir / "geotiff/mock-geotiffs/2000/observations_2m-temp-monthly_2000-01-01.tif"
+
+    metadata = GeoTiffToMetaData(path_parser).process(tiff_path)
+
+    assert not hasattr(metadata, "__dict__")
+    assert metadata.band == "2m-temp-monthly"
+
+
+def test_from_state_same_as_original(meta_list):
+    restored = [Metadata.from_state(m.to_state()) for m in meta_list]
+
+    assert [m.to_dict(include_internal=True) for m in restored] == [m.to_dict(include_internal=True) for m in meta_list]
+
+
+def test_get_gdal_env_reuses_env_with_same_options():
+    with rasterio.Env(**LOCAL_GDAL_OPTIONS):
+        assert isinstance(_get_gdal_env(LOCAL_GDAL_OPTIONS), contextlib.nullcontext)
+        assert isinstance(_get_gdal_env(REMOTE_GDAL_OPTIONS), rasterio.Env)
+
+
+@pytest.mark.parametrize(
+    "href", ["/data/2000/obs_2000-01-01.tif", "obs.tif", "/data/.hidden", "/data/obs.", "/data/obs.tar.gz", "/data/obs"]
+)
+def test_get_stem_same_as_path_stem(href):
+    assert _get_stem(href) == Path(href).stem
@@ -0,0 +1,162 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from stacbuilder.builder import FileCollector, FileCollectorConfig, GeoTiffToMetaData, TiffMetadataCollector
+from stacbuilder.config import InputPathParserConfig
+from stacbuilder.metadatacache import MetadataCache
+from stacbuilder.pathparsers import InputPathParser, InputPathParserFactory
+
+
+@pytest.fixture
+def parser_config() -> InputPathParserConfig:
+    return InputPathParserConfig(
+        classname="RegexInputPathParser",
+        parameters={"regex_pattern": r".*_(?P<band>[a-zA-Z0-9\-]+)_(?P<datetime>\d{4}-\d{2}-\d{2})\.tif$"},
+    )
+
+
+@pytest.fixture
+def path_parser(parser_config) -> InputPathParser:
+    return InputPathParserFactory.from_config(parser_config)
+
+
+@pytest.fixture
+def tiff_file(data_dir, tmp_path):
+    src = data_dir / "geotiff/mock-geotiffs/2000/observations_2m-temp-monthly_2000-01-01.tif"
+    dst = tmp_path / "tiffs" / src.name
+    dst.parent.mkdir()
+    shutil.copy(src, dst)
+    return dst
+
+
+class TestMetadataCache:
+    def test_set_and_get(self, tmp_path, tiff_file, path_parser, parser_config):
+        metadata = GeoTiffToMetaData(path_parser).process(tiff_file)
+
+        with MetadataCache(tmp_path / "cache" / "metadata", settings=parser_config) as cache:
+            assert cache.get(tiff_file) is None
+            cache.set(tiff_file, metadata)
+
+        with MetadataCache(tmp_path / "cache" / "metadata", settings=parser_config) as cache:
+            cached = cache.get(tiff_file)
+
+        assert cached.to_dict() == metadata.to_dict()
+
+    def test_stores_plain_dict_without_path_parser(self, tmp_path, tiff_file, path_parser, parser_config):
+        metadata = GeoTiffToMetaData(path_parser).process(tiff_file)
+
+        with MetadataCache(tmp_path / "metadata", settings=parser_config) as cache:
+            cache.set(tiff_file, metadata)
+            entry = cache._db[cache.get_key(tiff_file)]
+
+        assert isinstance(entry, dict)
+        assert "_extract_href_info" not in entry
+
+    def test_modified_file_is_a_miss(self, tmp_path, tiff_file, path_parser, parser_config):
+        metadata = GeoTiffToMetaData(path_parser).process(tiff_file)
+        with MetadataCache(tmp_path / "metadata", settings=parser_config) as cache:
+            cache.set(tiff_file, metadata)
+
+            stat = os.stat(tiff_file)
+            os.utime(tiff_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+            assert cache.get(tiff_file) is None
+
+    def test_other_settings_are_a_miss(self, tmp_path, tiff_file, path_parser, parser_config):
+        metadata = GeoTiffToMetaData(path_parser).process(tiff_file)
+        with MetadataCache(tmp_path / "metadata", settings=parser_config) as cache:
+            cache.set(tiff_file, metadata)
+
+        other_config = InputPathParserConfig(
+            classname="RegexInputPathParser", parameters={"regex_pattern": r".*_(?P<band>[a-z]+)\.tif$"}
+        )
+        with MetadataCache(tmp_path / "metadata", settings=other_config) as cache:
+            assert cache.get(tiff_file) is None
+
+
+def test_tiff_metadata_collector_with_cache(tmp_path, tiff_file, path_parser, parser_config):
+    file_collector = FileCollector()
+    file_collector.setup(FileCollectorConfig(input_dir=tiff_file.parent, glob="*.tif"))
+    cache = MetadataCache(tmp_path / "metadata", settings=parser_config)
+
+    collector = TiffMetadataCollector(file_collector, path_parser, cache=cache)
+    collector.collect()
+    expected = [m.to_dict() for m in collector.metadata]
+
+    def fail(file):
+        raise AssertionError(f"Metadata for {file} should have come from the cache")
+
+    collector = TiffMetadataCollector(file_collector, path_parser, cache=cache)
+    collector._processor.process = fail
+    collector.collect()
+
+    assert [m.to_dict() for m in collector.metadata] == expected
+
+
+def test_tiff_metadata_collector_gets_each_key_once(tmp_path, tiff_file, path_parser, parser_config, monkeypatch):
+    file_collector = FileCollector()
+    file_collector.setup(FileCollectorConfig(input_dir=tiff_file.parent, glob="*.tif"))
+    cache = MetadataCache(tmp_path / "metadata", settings=parser_config)
+
+    key_calls = []
+    original_get_key = MetadataCache.get_key
+
+    def counting_get_key(self, file):
+        key_calls.append(file)
+        return original_get_key(self, file)
+
+    monkeypatch.setattr(MetadataCache, "get_key", counting_get_key)
+    TiffMetadataCollector(file_collector, path_parser, cache=cache).collect()
+
+    assert key_calls == [tiff_file]
+
+
+def test_tiff_metadata_collector_reads_only_missing_files_per_batch(
+    data_dir, tmp_path, path_parser, parser_config, monkeypatch
+):
+    cache = MetadataCache(tmp_path / "metadata", settings=parser_config)
+    input_dir = data_dir / "geotiff/mock-geotiffs"
+    file_collector = FileCollector()
+    file_collector.setup(FileCollectorConfig(input_dir=input_dir, glob="*/*.tif", max_files=7))
+    TiffMetadataCollector(file_collector, path_parser, cache=cache).collect()
+
+    processed = []
+    original_process = GeoTiffToMetaData.process
+
+    def recording_process(self, file):
+        processed.append(file)
+        return original_process(self, file)
+
+    monkeypatch.setattr(GeoTiffToMetaData, "process", recording_process)
+    monkeypatch.setattr("stacbuilder.builder.CACHE_BATCH_SIZE", 5)
+    file_collector.setup(FileCollectorConfig(input_dir=input_dir, glob="*/*.tif"))
+    collector = TiffMetadataCollector(file_collector, path_parser, max_workers=2, cache=cache)
+    hrefs = [m.href for m in collector.collect_iter()]
+
+    file_collector.collect()
+    input_files = list(file_collector.input_files)
+    assert hrefs == [str(f) for f in input_files]
+    assert sorted(processed) == sorted(input_files[7:])
+
+
+def test_tiff_metadata_collector_with_cache_from_other_working_directory(
+    tmp_path, tiff_file, path_parser, parser_config, monkeypatch
+):
+    cache = MetadataCache(tmp_path / "metadata", settings=parser_config)
+    file_collector = FileCollector()
+
+    monkeypatch.chdir(tiff_file.parent.parent)
+    file_collector.setup(FileCollectorConfig(input_dir=Path(tiff_file.parent.name), glob="*.tif"))
+    TiffMetadataCollector(file_collector, path_parser, cache=cache).collect()
+
+    # The same file, but through a different relative path.
+    monkeypatch.chdir(tiff_file.parent)
+    file_collector.setup(FileCollectorConfig(input_dir=Path("."), glob="*.tif"))
+    collector = TiffMetadataCollector(file_collector, path_parser, cache=cache)
+    collector.collect()
+
+    assert [m.href for m in collector.metadata] == [tiff_file.name]
+    assert Path(collector.metadata[0].href).exists()
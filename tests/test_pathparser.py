@@ -1,4 +1,7 @@
 import datetime as dt
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 import pytest
@@ -8,6 +11,7 @@ from stacbuilder.pathparsers import (
     InputPathParserFactory,
     RegexInputPathParser,
     ERA5LandInputPathParser,
+    LandsatNDWIInputPathParser,
     UnknownInputPathParserClass,
 )
 from stacbuilder.config import InputPathParserConfig
@@ -99,6 +103,30 @@ class TestRegexInputPathParser:
             == ".*/reanalysis-era5-land-monthly-means_(?P<band>[a-zA-Z0-9\\_]+_monthly)_(?P<year>\\d{4})(?P<month>\\d{2})(?P<day>\\d{2})\\.tif$"
         )
 
+    def test_parse_from_several_threads(self):
+        parser = LandsatNDWIInputPathParser(regex_pattern=r".*_(?P<year>\d{4})\.tif$")
+        paths = [f"/data/ndwi_{year}.tif" for year in range(1000, 3000)]
+
+        # Switch threads as often as possible, to make it likely that they interleave.
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(parser.parse, paths))
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        assert [r["year"] for r in results] == list(range(1000, 3000))
+        assert [r["datetime"].year for r in results] == list(range(1000, 3000))
+
+    def test_parser_can_be_pickled(self):
+        parser = RegexInputPathParser(regex_pattern=r".*_(?P<band>[a-z]+)\.tif$")
+        parser.parse("/data/tile_red.tif")
+
+        unpickled = pickle.loads(pickle.dumps(parser))
+
+        assert unpickled.parse("/data/tile_blue.tif") == {"band": "blue"}
+
 
 class TestERA5LandInputPathParser:
 
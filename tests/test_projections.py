@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import rasterio.crs
+from openeo.util import normalize_crs
+
+from stacbuilder.projections import get_crs, get_normalized_crs, get_transformer, reproject_bounding_box
+
+
+def test_get_crs_is_cached():
+    assert get_crs(32631) is get_crs(32631)
+    assert get_crs(32631).to_epsg() == 32631
+
+
+@pytest.mark.parametrize("crs", [rasterio.crs.CRS.from_epsg(32631), 4326, "EPSG:3857", None])
+def test_get_normalized_crs_same_as_normalize_crs(crs):
+    assert get_normalized_crs(crs) == normalize_crs(crs)
+
+
+def test_get_transformer_is_cached_per_thread():
+    transformer = get_transformer(32631, "epsg:4326")
+    assert get_transformer(32631, "epsg:4326") is transformer
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other_thread_transformer = executor.submit(get_transformer, 32631, "epsg:4326").result()
+    assert other_thread_transformer is not transformer
+
+
+def test_reproject_bounding_box():
+    bbox = reproject_bounding_box(500000.0, 0.0, 500000.0, 0.0, from_crs=32631, to_crs="epsg:4326")
+
+    assert bbox == pytest.approx([3.0, 0.0, 3.0, 0.0])
@@ -1,15 +1,25 @@
+import json
+import threading
 from pathlib import Path
 from typing import List
 
 
+import geopandas as gpd
+import pandas as pd
 import pytest
 import rasterio
 import numpy as np
 from pystac.collection import Collection
+from shapely.geometry import Point, box, mapping, shape
 
 
 from stacbuilder.builder import (
+    FileCollector,
+    FileCollectorConfig,
+    GeoTiffPipeline,
+    GeoTiffToMetaData,
     STACBuilder,
+    TiffMetadataCollector,
     command_build_collection,
     command_list_input_files,
     command_list_metadata,
@@ -17,8 +27,16 @@ from stacbuilder.builder import (
     command_load_collection,
     command_validate_collection,
     command_post_process_collection,
+    _geojson_to_shapes,
+    _load_collection_config,
+    _map_in_parallel,
+    _match_directory,
+    _save_metadata_batches,
 )
 from stacbuilder.config import CollectionConfig, InputPathParserConfig, AssetConfig, EOBandConfig
+from stacbuilder.metadata import enter_local_gdal_env
+from stacbuilder.metadatacache import MetadataCache
+from stacbuilder.pathparsers import InputPathParserFactory
 
 
 @pytest.fixture
@@ -149,10 +167,12 @@ class TestSTACBuilder:
         #   stored in git.
         create_geotiff_files(geotiff_paths)
 
+    @pytest.mark.parametrize("scan_workers", [1, 4])
     def test_collect_input_files(
-        self, stac_builder: STACBuilder, collection_test_config: CollectionConfig, geotiff_paths
+        self, stac_builder: STACBuilder, collection_test_config: CollectionConfig, geotiff_paths, scan_workers
     ):
         stac_builder.collection_config = collection_test_config
+        stac_builder.scan_workers = scan_workers
         stac_builder.collect_input_files()
 
         assert sorted(stac_builder.input_files) == sorted(geotiff_paths)
@@ -166,6 +186,19 @@ class TestSTACBuilder:
         assert stac_builder.collection
         assert collection == stac_builder.collection
 
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_try_parse_items_keeps_order_of_files(
+        self, stac_builder: STACBuilder, collection_test_config: CollectionConfig, max_workers
+    ):
+        stac_builder.collection_config = collection_test_config
+        stac_builder.max_workers = max_workers
+        stac_builder.collect_input_files()
+        expected_hrefs = [str(f) for f in stac_builder.input_files]
+
+        items = list(stac_builder.try_parse_items())
+
+        assert [item.assets[item.id.split("_")[1]].href for item in items] == expected_hrefs
+
     def test_validate_collection(self, stac_builder: STACBuilder, collection_test_config: CollectionConfig):
         stac_builder.collection_config = collection_test_config
         stac_builder.collect_input_files()
@@ -188,6 +221,352 @@ class TestSTACBuilder:
         collection = Collection.from_file(stac_builder.collection_file)
         collection.validate_all()
 
+    def test_get_item_paths_for_coll_file(self, tmp_path):
+        collection_file = tmp_path / "collection.json"
+        collection_file.write_text(
+            json.dumps(
+                {
+                    "links": [
+                        {"rel": "root", "href": "./collection.json"},
+                        {"rel": "item", "href": "./2000/item-2000.json"},
+                        {"rel": "child", "href": "./2001/catalog.json"},
+                    ]
+                }
+            )
+        )
+        child_file = tmp_path / "2001/catalog.json"
+        child_file.parent.mkdir()
+        child_file.write_text(
+            json.dumps(
+                {
+                    "links": [
+                        {"rel": "parent", "href": "../collection.json"},
+                        {"rel": "item", "href": "./item-2001.json"},
+                    ]
+                }
+            )
+        )
+
+        item_paths = STACBuilder.get_item_paths_for_coll_file(collection_file)
+
+        assert item_paths == [tmp_path / "2000/item-2000.json", tmp_path / "2001/item-2001.json"]
+
+
+class TestFileCollector:
+    @pytest.mark.parametrize(
+        "glob",
+        [
+            "*/*.tif",
+            "2000/*.tif",
+            "./*/*_2001*.tif",
+            "*",
+            "**/*.tif",
+            "**/2001/*.tif",
+            "2000/**/*_2000-0[12]*.tif",
+            "**/*/*.tif",
+            "2000/observations_2m-temp-monthly_2000-01-01.tif",
+            "*/observations_2m-temp-monthly_2000-01-01.tif",
+            "missing/*.tif",
+            "2000",
+        ],
+    )
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_collect_matches_path_glob(self, data_dir, glob, max_workers):
+        input_dir = data_dir / "geotiff/mock-geotiffs"
+        collector = FileCollector()
+        collector.setup(FileCollectorConfig(input_dir=input_dir, glob=glob, max_workers=max_workers))
+
+        collector.collect()
+
+        expected = sorted(f for f in input_dir.glob(glob) if f.is_file())
+        assert sorted(collector.input_files) == expected
+
+    def test_collect_with_workers_keeps_order(self, tmp_path):
+        for i in range(10):
+            for j in range(3):
+                (tmp_path / f"dir{i}" / f"sub{j}").mkdir(parents=True)
+                (tmp_path / f"dir{i}" / f"sub{j}" / "1.tif").touch()
+        collector = FileCollector()
+
+        collector.setup(FileCollectorConfig(input_dir=tmp_path, glob="**/*.tif"))
+        collector.collect()
+        expected = list(collector.input_files)
+
+        collector.setup(FileCollectorConfig(input_dir=tmp_path, glob="**/*.tif", max_workers=4))
+        collector.collect()
+        assert list(collector.input_files) == expected
+        assert len(expected) == 30
+
+    def test_collect_respects_max_files(self, data_dir):
+        collector = FileCollector()
+        collector.setup(FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif", max_files=3))
+
+        collector.collect()
+
+        assert len(list(collector.input_files)) == 3
+
+    @pytest.mark.parametrize("glob", ["*/*.tif", "**/*.tif", "2000/../2000/*.tif"])
+    def test_iter_file_paths_same_as_input_files(self, data_dir, glob):
+        collector = FileCollector()
+        collector.setup(FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob=glob, max_files=5))
+
+        file_paths = list(collector.iter_file_paths())
+        collector.collect()
+
+        assert all(isinstance(f, str) for f in file_paths)
+        assert file_paths == [str(f) for f in collector.input_files]
+
+    def test_collect_skips_files_found_twice_through_symlinks(self, tmp_path):
+        input_dir = tmp_path / "input"
+        (input_dir / "a").mkdir(parents=True)
+        (input_dir / "a" / "1.tif").touch()
+        (input_dir / "a" / "2.tif").symlink_to(input_dir / "a" / "1.tif")
+        (input_dir / "b").symlink_to(input_dir / "a", target_is_directory=True)
+        (tmp_path / "outside").mkdir()
+        (tmp_path / "outside" / "3.tif").touch()
+        (input_dir / "c").symlink_to(tmp_path / "outside", target_is_directory=True)
+        (input_dir / "d").symlink_to(tmp_path / "outside", target_is_directory=True)
+        collector = FileCollector()
+        collector.setup(FileCollectorConfig(input_dir=input_dir, glob="*/*.tif"))
+
+        collector.collect()
+
+        # Path.glob would also return b/1.tif, a/2.tif, b/2.tif and both c/3.tif and d/3.tif.
+        first, second = sorted(collector.input_files)
+        assert first == input_dir / "a" / "1.tif"
+        assert second in (input_dir / "c" / "3.tif", input_dir / "d" / "3.tif")
+
+
+class TestTiffMetadataCollector:
+    @pytest.fixture
+    def file_collector(self, data_dir) -> FileCollector:
+        collector = FileCollector()
+        collector.setup(FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif"))
+        return collector
+
+    @pytest.mark.parametrize(
+        ["max_workers", "use_processes"],
+        [
+            (None, False),
+            (1, False),
+            (4, False),
+            (2, True),
+        ],
+    )
+    def test_collect(
+        self, file_collector, collection_test_config: CollectionConfig, geotiff_paths, max_workers, use_processes
+    ):
+        path_parser = InputPathParserFactory.from_config(collection_test_config.input_path_parser)
+        collector = TiffMetadataCollector(
+            file_collector, path_parser, max_workers=max_workers, use_processes=use_processes
+        )
+
+        collector.collect()
+
+        assert collector.has_collected()
+        assert sorted(m.href for m in collector.metadata) == sorted(str(p) for p in geotiff_paths)
+
+    def test_collect_iter(self, file_collector, collection_test_config: CollectionConfig):
+        path_parser = InputPathParserFactory.from_config(collection_test_config.input_path_parser)
+        collector = TiffMetadataCollector(file_collector, path_parser, max_workers=4)
+
+        hrefs = [m.href for m in collector.collect_iter()]
+
+        assert not collector.has_collected()
+        collector.collect()
+        assert hrefs == [m.href for m in collector.metadata]
+
+    def test_collect_iter_reads_files_while_collecting_them(
+        self, file_collector, collection_test_config: CollectionConfig, monkeypatch
+    ):
+        found = []
+        find_files = file_collector._find_file_paths
+
+        def recording_find_files():
+            for file in find_files():
+                found.append(file)
+                yield file
+
+        monkeypatch.setattr(file_collector, "_find_file_paths", recording_find_files)
+        path_parser = InputPathParserFactory.from_config(collection_test_config.input_path_parser)
+        collector = TiffMetadataCollector(file_collector, path_parser, max_workers=2, prefetch=2)
+
+        first = next(iter(collector.collect_iter()))
+
+        assert first.href == str(found[0])
+        assert len(found) == 2
+
+
+@pytest.mark.parametrize("prefetch", [None, 1, 3])
+def test_map_in_parallel_limits_tasks_in_flight(prefetch):
+    submitted = []
+
+    def values():
+        for i in range(20):
+            submitted.append(i)
+            yield i
+
+    results = iter(_map_in_parallel(lambda x: x * x, values(), max_workers=4, prefetch=prefetch))
+    first = next(results)
+
+    # The default is twice the number of workers.
+    assert len(submitted) == (prefetch or 8)
+    assert [first] + list(results) == [i * i for i in range(20)]
+
+
+def test_map_in_parallel_with_processes_keeps_order():
+    values = list(range(-200, 0))
+
+    results = _map_in_parallel(abs, iter(values), max_workers=2, use_processes=True)
+
+    assert list(results) == [abs(v) for v in values]
+
+
+def test_map_in_parallel_with_processes_takes_values_lazily():
+    submitted = []
+
+    def values():
+        for i in range(-200, 0):
+            submitted.append(i)
+            yield i
+
+    results = iter(_map_in_parallel(abs, values(), max_workers=2, use_processes=True))
+    first = next(results)
+
+    # Twice the number of workers in flight, in chunks of 1, 2, 4 and 8 values.
+    assert len(submitted) == 15
+    assert [first] + list(results) == list(range(200, 0, -1))
+
+
+def test_map_in_parallel_keeps_local_gdal_env_in_workers():
+    def get_readdir_option(_):
+        return rasterio.env.getenv().get("GDAL_DISABLE_READDIR_ON_OPEN")
+
+    results = list(_map_in_parallel(get_readdir_option, range(8), max_workers=2, initializer=enter_local_gdal_env))
+
+    assert results == ["TRUE"] * 8
+    assert not rasterio.env.hasenv()
+
+
+class TestGeoTiffPipeline:
+    @pytest.fixture
+    def pipeline(self, data_dir, collection_test_config: CollectionConfig) -> GeoTiffPipeline:
+        file_coll_cfg = FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif")
+        return GeoTiffPipeline.from_config(collection_test_config, file_coll_cfg)
+
+    def test_get_metadata_with_cache(self, data_dir, collection_test_config: CollectionConfig, tmp_path, monkeypatch):
+        file_coll_cfg = FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif")
+        cache = MetadataCache(tmp_path / "metadata", settings=collection_test_config.input_path_parser)
+        pipeline = GeoTiffPipeline.from_config(collection_test_config, file_coll_cfg, metadata_cache=cache)
+        expected = [m.to_dict() for m in pipeline.get_metadata()]
+
+        def fail(self, file):
+            raise AssertionError(f"Metadata for {file} should have come from the cache")
+
+        monkeypatch.setattr(GeoTiffToMetaData, "process", fail)
+        assert [m.to_dict() for m in pipeline.get_metadata()] == expected
+
+    def test_get_metadata_reads_files_in_worker_threads(
+        self, data_dir, collection_test_config: CollectionConfig, monkeypatch
+    ):
+        file_coll_cfg = FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif")
+        pipeline = GeoTiffPipeline.from_config(collection_test_config, file_coll_cfg, max_workers=4)
+
+        threads = set()
+        original_process = GeoTiffToMetaData.process
+
+        def recording_process(self, file):
+            threads.add(threading.current_thread())
+            return original_process(self, file)
+
+        monkeypatch.setattr(GeoTiffToMetaData, "process", recording_process)
+        hrefs = [m.href for m in pipeline.get_metadata()]
+
+        assert threads and threading.current_thread() not in threads
+        assert hrefs == [str(f) for f in pipeline.get_input_files()]
+
+    def test_get_metadata_with_processes(self, pipeline: GeoTiffPipeline, data_dir, collection_test_config):
+        file_coll_cfg = FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif")
+        process_pipeline = GeoTiffPipeline.from_config(
+            collection_test_config, file_coll_cfg, max_workers=2, use_processes=True
+        )
+
+        expected = [m.to_dict() for m in pipeline.get_metadata()]
+        assert [m.to_dict() for m in process_pipeline.get_metadata()] == expected
+
+    def test_get_stac_items_with_cache(self, data_dir, collection_test_config: CollectionConfig, tmp_path, monkeypatch):
+        file_coll_cfg = FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif")
+        cache = MetadataCache(tmp_path / "metadata", settings=collection_test_config.input_path_parser)
+        pipeline = GeoTiffPipeline.from_config(collection_test_config, file_coll_cfg, metadata_cache=cache)
+        expected = [item.to_dict()["assets"] for item in pipeline.get_stac_items()]
+
+        def fail(self, file):
+            raise AssertionError(f"Metadata for {file} should have come from the cache")
+
+        monkeypatch.setattr(GeoTiffToMetaData, "process", fail)
+        assert [item.to_dict()["assets"] for item in pipeline.get_stac_items()] == expected
+
+    def test_iter_stac_items_with_source(self, data_dir, collection_test_config: CollectionConfig, geotiff_paths):
+        # Only configure one of the two item types, so the files of the other type fail.
+        collection_test_config.item_assets = {"2m-temp-monthly": collection_test_config.item_assets["2m-temp-monthly"]}
+        file_coll_cfg = FileCollectorConfig(input_dir=data_dir / "geotiff/mock-geotiffs", glob="*/*.tif")
+        pipeline = GeoTiffPipeline.from_config(collection_test_config, file_coll_cfg)
+
+        results = list(pipeline.iter_stac_items_with_source())
+
+        assert sorted(file for file, _ in results) == geotiff_paths
+        failed = sorted(file.name for file, item in results if item is None)
+        assert failed == sorted(p.name for p in geotiff_paths if "tot-precip" in p.name)
+        assert all(item.assets["2m-temp-monthly"].href == str(file) for file, item in results if item is not None)
+
+    def test_get_stac_items_do_not_share_asset_fields(self, pipeline: GeoTiffPipeline):
+        items = [item for item in pipeline.get_stac_items() if "2m-temp-monthly" in item.assets]
+        first_asset = items[0].assets["2m-temp-monthly"]
+        first_asset.roles.append("extra-role")
+        first_asset.extra_fields["eo:bands"].append({"name": "extra-band"})
+
+        other_asset = items[1].assets["2m-temp-monthly"]
+        assert "extra-role" not in other_asset.roles
+        assert {"name": "extra-band"} not in other_asset.extra_fields["eo:bands"]
+
+    def test_get_metadata_as_geodataframe(self, pipeline: GeoTiffPipeline, geotiff_paths):
+        df = pipeline.get_metadata_as_geodataframe()
+
+        assert sorted(df["href"]) == sorted(str(p) for p in geotiff_paths)
+        assert df.crs.to_epsg() == 4326
+        # Lists and datetimes are converted to strings so the data can be saved to a file.
+        assert isinstance(df["bbox"].iloc[0], str)
+        assert isinstance(df["datetime"].iloc[0], str)
+
+    def test_iter_metadata_as_geodataframes(self, pipeline: GeoTiffPipeline, geotiff_paths):
+        batches = list(pipeline.iter_metadata_as_geodataframes(batch_size=5))
+
+        assert [len(gdf) for gdf in batches] == [5, 5, 2]
+        assert [i for gdf in batches for i in gdf.index] == list(range(len(geotiff_paths)))
+
+    def test_get_metadata_as_dataframe(self, pipeline: GeoTiffPipeline, geotiff_paths):
+        df = pipeline.get_metadata_as_dataframe()
+
+        assert len(df) == len(geotiff_paths)
+        assert list(df.columns)[:2] == ["itemId", "href"]
+
+
+class TestLoadCollectionConfig:
+    def test_reuses_config_until_file_changes(self, data_dir, tmp_path):
+        config_file = tmp_path / "config.json"
+        config_file.write_text((data_dir / "config/config-test-collection.json").read_text())
+
+        config = _load_collection_config(config_file)
+        assert _load_collection_config(config_file) is config
+
+        data = json.loads(config_file.read_text())
+        data["title"] = "A different title"
+        config_file.write_text(json.dumps(data))
+
+        new_config = _load_collection_config(config_file)
+        assert new_config is not config
+        assert new_config.title == "A different title"
+
 
 class TestCommandAPI:
     def test_command_build_collection(self, data_dir, tmp_path):
@@ -228,16 +607,74 @@ class TestCommandAPI:
         # TODO: how to verify the output? For now this is just a smoke test.
         #   The underlying functionality can actually be tested more directly.
 
-    def test_command_list_metadata(self, data_dir):
+    def test_command_list_metadata(self, data_dir, tmp_path, monkeypatch):
         config_file = data_dir / "config/config-test-collection.json"
         input_dir = data_dir / "geotiff/mock-geotiffs"
+        # The dataframes are saved in tmp/visualization in the working directory.
+        monkeypatch.chdir(tmp_path)
         command_list_metadata(collection_config_path=config_file, glob="*/*.tif", input_dir=input_dir)
         # TODO: how to verify the output? For now this is just a smoke test.
         #   The underlying functionality can actually be tested more directly.
 
-    def test_command_list_items(self, data_dir):
+    @pytest.mark.parametrize("save_shapefile", [False, True])
+    def test_command_list_metadata_saves_dataframe(self, data_dir, tmp_path, monkeypatch, save_shapefile):
+        config_file = data_dir / "config/config-test-collection.json"
+        input_dir = data_dir / "geotiff/mock-geotiffs"
+        monkeypatch.chdir(tmp_path)
+
+        command_list_metadata(
+            collection_config_path=config_file,
+            glob="*/*.tif",
+            input_dir=input_dir,
+            save_dataframe=True,
+            save_shapefile=save_shapefile,
+        )
+
+        out_dir = tmp_path / "tmp/visualization" / CollectionConfig.from_json_file(config_file).collection_id
+        assert (out_dir / "metadata_table.csv").exists()
+        assert len(gpd.read_parquet(out_dir / "metadata_table.parquet")) == 12
+        assert (out_dir / "shp/metadata_table.shp").exists() == save_shapefile
+
+    def test_command_list_metadata_reads_each_file_once(self, data_dir, tmp_path, monkeypatch):
+        config_file = data_dir / "config/config-test-collection.json"
+        input_dir = data_dir / "geotiff/mock-geotiffs"
+        monkeypatch.chdir(tmp_path)
+
+        processed = []
+        original_process = GeoTiffToMetaData.process
+
+        def counting_process(self, file):
+            processed.append(file)
+            return original_process(self, file)
+
+        monkeypatch.setattr(GeoTiffToMetaData, "process", counting_process)
+        command_list_metadata(collection_config_path=config_file, glob="*/*.tif", input_dir=input_dir)
+
+        assert len(processed) == 12
+
+    @pytest.mark.parametrize("command", [command_list_metadata, command_list_stac_items])
+    def test_command_walks_input_directory_once(self, data_dir, tmp_path, monkeypatch, command):
+        config_file = data_dir / "config/config-test-collection.json"
+        input_dir = data_dir / "geotiff/mock-geotiffs"
+        monkeypatch.chdir(tmp_path)
+
+        walks = []
+
+        def counting_match_directory(directory, segments, index):
+            if index == 0:
+                walks.append(directory)
+            return _match_directory(directory, segments, index)
+
+        monkeypatch.setattr("stacbuilder.builder._match_directory", counting_match_directory)
+        command(collection_config_path=config_file, glob="*/*.tif", input_dir=input_dir)
+
+        assert walks == [str(input_dir)]
+
+    def test_command_list_items(self, data_dir, tmp_path, monkeypatch):
         config_file = data_dir / "config/config-test-collection.json"
         input_dir = data_dir / "geotiff/mock-geotiffs"
+        # The dataframes are saved in tmp/visualization in the working directory.
+        monkeypatch.chdir(tmp_path)
         command_list_stac_items(collection_config_path=config_file, glob="*/*.tif", input_dir=input_dir)
         # TODO: how to verify the output? For now this is just a smoke test.
         #   The underlying functionality can actually be tested more directly.
@@ -296,3 +733,35 @@ class TestCommandAPI:
         )
         # TODO: how to verify the output? For now this is just a smoke test.
         #   The underlying functionality can actually be tested more directly.
+
+
+@pytest.mark.parametrize(
+    "geometries",
+    [
+        [mapping(box(0, 0, 1, 1)), mapping(box(2, 3, 4, 5))],
+        [mapping(box(0, 0, 1, 1)), mapping(Point(2, 3))],
+        [mapping(box(0, 0, 1, 1)), mapping(box(0, 0, 4, 4).difference(box(1, 1, 2, 2)))],
+    ],
+)
+def test_geojson_to_shapes_same_as_shape(geometries):
+    shapes = _geojson_to_shapes(geometries)
+
+    assert [s.equals_exact(shape(g), 0) for s, g in zip(shapes, geometries)] == [True] * len(geometries)
+
+
+def test_save_metadata_batches(data_dir, tmp_path, collection_test_config: CollectionConfig):
+    path_parser = InputPathParserFactory.from_config(collection_test_config.input_path_parser)
+    tiff_paths = sorted((data_dir / "geotiff/mock-geotiffs").glob("*/*.tif"))
+    meta_list = [GeoTiffToMetaData(path_parser).process(path) for path in tiff_paths]
+    # A column that only has values after the first batch.
+    for metadata in meta_list[5:]:
+        metadata.start_datetime = metadata.datetime
+
+    _save_metadata_batches(meta_list, tmp_path, "metadata_table", save_shapefile=True, batch_size=5)
+
+    gdf = gpd.read_parquet(tmp_path / "metadata_table.parquet")
+    assert list(gdf["href"]) == [m.href for m in meta_list]
+    assert gdf["start_datetime"].isna().sum() == 5
+    assert gdf.crs.to_epsg() == meta_list[0].proj_epsg
+    assert list(gpd.read_file(tmp_path / "shp/metadata_table.shp")["href"]) == [m.href for m in meta_list]
+    assert len(pd.read_csv(tmp_path / "metadata_table.csv", sep="|")) == 12
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+
+from stacbuilder.timezoneformat import TimezoneFormatConverter
+
+
+@pytest.fixture
+def item_dict():
+    return {
+        "type": "Feature",
+        "stac_version": "1.0.0",
+        "id": "item-2000-01-01",
+        "properties": {
+            "datetime": "2000-01-01T00:00:00Z",
+            "start_datetime": "2000-01-01T00:00:00Z",
+            "end_datetime": "2000-01-31T23:59:59.500000Z",
+        },
+    }
+
+
+@pytest.fixture
+def item_file(tmp_path, item_dict):
+    in_path = tmp_path / "item.json"
+    with open(in_path, "w") as f_out:
+        json.dump(item_dict, f_out, indent=2)
+    return in_path
+
+
+@pytest.mark.parametrize("use_fast_path", [True, False])
+def test_convert_item(tmp_path, item_file, use_fast_path):
+    out_path = tmp_path / "item-converted.json"
+
+    TimezoneFormatConverter(use_fast_path=use_fast_path).convert_item(item_file, out_path)
+
+    with open(out_path, "r") as f_in:
+        props = json.load(f_in)["properties"]
+    assert props["datetime"] == "2000-01-01T00:00:00+00:00"
+    assert props["start_datetime"] == "2000-01-01T00:00:00+00:00"
+    assert props["end_datetime"] == "2000-01-31T23:59:59.500000+00:00"
+
+
+def test_convert_item_fast_path_in_place(item_file):
+    TimezoneFormatConverter(use_fast_path=True).convert_item(item_file, item_file)
+
+    with open(item_file, "r") as f_in:
+        props = json.load(f_in)["properties"]
+    assert props["datetime"] == "2000-01-01T00:00:00+00:00"